@@ -1,123 +1,479 @@
-import io
+import asyncio
+import json
+import os
+import tempfile
+import time
 import uuid
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
-
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    UploadFile,
+)
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from ..core.config import get_settings
 from ..services.ml_service import ml_service
+from ..services.profiling import JobProfiler
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+EXPORT_CHUNK_ROWS = 5000
+SSE_RETRY_MS = 3000
+
+
+class PredictRequest(BaseModel):
+    text: Optional[str] = None
+    texts: Optional[List[str]] = None
+
+
+@dataclass
+class Page:
+    offset: int
+    limit: int
+    fields: Optional[List[str]]
+    format: str
+
+
+def page_params(
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="Колонки через запятую"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+) -> Page:
+    settings = get_settings()
+    limit = min(limit or settings.default_page_size, settings.max_page_size)
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return Page(offset, limit, columns, format)
+
+
+def _project(df: pd.DataFrame, fields: Optional[List[str]]) -> pd.DataFrame:
+    if not fields:
+        return df
+    unknown = [f for f in fields if f not in df.columns]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+    return df[fields]
+
+
+def _ndjson_response(
+    df: pd.DataFrame, profiler: Optional[JobProfiler] = None
+) -> StreamingResponse:
+    def rows():
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start : start + EXPORT_CHUNK_ROWS]
+            yield chunk.to_json(orient="records", lines=True, force_ascii=False)
+
+    body = rows() if profiler is None else profiler.wrap_iter("serialize", rows())
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+def _paginate(
+    df: pd.DataFrame,
+    page: Page,
+    key: str,
+    profiler: Optional[JobProfiler] = None,
+    **extra: Any,
+):
+    """Отдаёт одну страницу строк либо весь набор потоком NDJSON"""
+    df = _project(df, page.fields)
+    if page.format == "ndjson":
+        return _ndjson_response(df, profiler)
+    if profiler is not None:
+        with profiler.capture("serialize"):
+            return _page_body(df, page, key, extra)
+    return _page_body(df, page, key, extra)
+
+
+def _page_body(df: pd.DataFrame, page: Page, key: str, extra: Dict[str, Any]):
+    end = min(page.offset + page.limit, len(df))
+    body: Dict[str, Any] = dict(extra)
+    rows = df.iloc[page.offset : end]
+    body[key] = rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+    body["pagination"] = {
+        "offset": page.offset,
+        "limit": page.limit,
+        "total": len(df),
+        "next_offset": end if end < len(df) else None,
+    }
+    return body
+
+
+async def _completed_task(task_id: str):
+    status = ml_service.get_task_status(task_id)
+    if not status or status["status"] != "completed":
+        raise HTTPException(404, "Results not ready")
+
+    df = await ml_service.load_result(task_id)
+    if df is None:
+        raise HTTPException(404, "Results expired")
+    return status, df
+
+
+async def _queryable_task(task_id: str):
+    """Завершённая задача либо уже размеченная часть выполняющейся"""
+    status = ml_service.get_task_status(task_id)
+    partial = status.get("partial") if status else None
+    if partial is not None and status["status"] == "processing":
+        return {"facets": partial.facets, "index": partial.index}, partial.frame()
+    return await _completed_task(task_id)
+
+
+async def _save_upload(file: UploadFile, max_size: int) -> str:
+    """Сохраняет загрузку во временный файл по частям, не превышая max_size"""
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(413, f"File exceeds {max_size} bytes")
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
 
 @router.post("/analyze")
-async def analyze_csv(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def analyze_csv(
+    file: UploadFile = File(...),
+    priority: int = Query(1, ge=1, le=10, description="Вес задачи в очереди"),
+    profile: Optional[str] = Query(
+        None,
+        pattern="^(cprofile|torch|all)$",
+        description="Профилировать задачу: cprofile, torch или all",
+    ),
+):
     if not file.filename.endswith(".csv"):
         raise HTTPException(400, "Only CSV files are supported")
+    if profile and get_settings().execution_mode == "distributed":
+        raise HTTPException(400, "Profiling is only available in local execution mode")
 
-    content = await file.read()
+    path = await _save_upload(file, get_settings().max_file_size)
     try:
-        df = pd.read_csv(io.BytesIO(content))
+        columns = pd.read_csv(path, nrows=0).columns
     except Exception as e:
+        os.remove(path)
         raise HTTPException(400, f"Invalid CSV: {str(e)}")
 
-    if "text" not in df.columns:
+    if "text" not in columns:
+        os.remove(path)
         raise HTTPException(400, "CSV must contain 'text' column")
 
     task_id = str(uuid.uuid4())
-    background_tasks.add_task(ml_service.analyze_dataframe, df, task_id)
-    return {"task_id": task_id, "message": "Analysis started"}
+    ml_service.create_task(task_id, profile=profile)
+    ml_service.submit_csv(path, task_id, priority)
+    return {
+        "task_id": task_id,
+        "message": "Analysis started",
+        "queue_position": ml_service.scheduler.position(task_id),
+    }
+
+
+@router.post("/predict")
+async def predict(request: PredictRequest):
+    """Онлайн-классификация одного текста или небольшого списка"""
+    texts = request.texts if request.texts is not None else []
+    if request.text is not None:
+        texts = [request.text] + texts
+    if not texts:
+        raise HTTPException(400, "Provide 'text' or 'texts'")
+
+    limit = get_settings().max_predict_texts
+    if len(texts) > limit:
+        raise HTTPException(413, f"At most {limit} texts per request, use /api/analyze")
+
+    predictions = await ml_service.predict_texts(texts)
+    return {
+        "results": [
+            {"text": text, "label": label, "confidence": confidence}
+            for text, (label, confidence) in zip(texts, predictions)
+        ]
+    }
 
 
 @router.get("/results/{task_id}")
-async def get_results(task_id: str):
+async def get_results(
+    task_id: str,
+    page: Page = Depends(page_params),
+    partial: bool = Query(False, description="Отдать уже размеченные строки"),
+):
     status = ml_service.get_task_status(task_id)
     if not status:
         raise HTTPException(404, "Task not found")
 
     if status["status"] == "processing":
-        return {
-            "status": "processing",
-            "progress": status["progress"],
-            "total": status["total"],
-        }
+        body = _progress_body(status)
+        buffer = status.get("partial")
+        if not partial or buffer is None:
+            return body
+        return _paginate(buffer.frame(), page, "data", **body)
+
+    if status["status"] == "failed":
+        return {"status": "failed", "error": status.get("error")}
+
+    if status["status"] == "cancelled":
+        return {"status": "cancelled"}
 
-    df = status.get("result")
+    df = await ml_service.load_result(task_id)
     if df is None:
-        raise HTTPException(500, "Results not available")
+        raise HTTPException(404, "Results expired")
 
-    return {
-        "status": "completed",
-        "data": df.to_dict(orient="records"),
-        "stats": {
+    facets = status.get("facets")
+    if facets is not None:
+        stats = facets.stats()
+    else:
+        stats = {
             "total": len(df),
             "negative": int((df["label"] == 0).sum()),
             "neutral": int((df["label"] == 1).sum()),
             "positive": int((df["label"] == 2).sum()),
-        },
+        }
+    return _paginate(
+        df, page, "data", status.get("profiler"), status="completed", stats=stats
+    )
+
+
+def _progress_body(status: Dict[str, Any]) -> Dict[str, Any]:
+    body = {
+        "status": "processing",
+        "progress": status["progress"],
+        "total": status["total"],
+        "queue_position": status.get("queue_position"),
     }
+    if status.get("partial") is not None:
+        body["stats"] = status["partial"].facets.stats()
+    return body
+
+
+def _event_body(status: Dict[str, Any]) -> Dict[str, Any]:
+    """Состояние задачи для события: без строк результата"""
+    if status["status"] == "processing":
+        return _progress_body(status)
+    if status["status"] == "failed":
+        return {"status": "failed", "error": status.get("error")}
+    body: Dict[str, Any] = {"status": status["status"]}
+    if status.get("facets") is not None:
+        body["stats"] = status["facets"].stats()
+    return body
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _task_events(task_id: str) -> AsyncIterator[str]:
+    """Поток событий задачи до её завершения.
+
+    Событие отправляется, только когда состояние изменилось, и не чаще
+    events_min_interval_ms. Следующее состояние читается после того, как
+    предыдущее ушло клиенту, поэтому медленному клиенту достаются не все
+    промежуточные обновления, а последнее. Без изменений раз в
+    events_heartbeat_seconds уходит комментарий, чтобы прокси не закрыли
+    соединение.
+    """
+    settings = get_settings()
+    timeout = settings.events_heartbeat_seconds
+    if ml_service.store is not None:
+        # Прогресс пишут воркеры в Redis, уведомлений нет: опрашиваем
+        timeout = min(timeout, settings.events_poll_seconds)
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+    sent = None
+    written = time.monotonic()
+    while True:
+        seen = ml_service.events.version(task_id)
+        status = ml_service.get_task_status(task_id)
+        if status is None:
+            yield _sse("expired", {"status": "expired"})
+            return
+        body = _event_body(status)
+        if body != sent:
+            processing = body["status"] == "processing"
+            yield _sse("progress" if processing else body["status"], body)
+            if not processing:
+                return
+            sent = body
+            written = time.monotonic()
+            await asyncio.sleep(settings.events_min_interval_ms / 1000)
+        elif time.monotonic() - written >= settings.events_heartbeat_seconds:
+            yield ": heartbeat\n\n"
+            written = time.monotonic()
+        await ml_service.events.wait(task_id, seen, timeout)
+
+
+@router.get("/results/{task_id}/events")
+async def task_events(task_id: str):
+    """Server-Sent Events с прогрессом задачи вместо опроса /results"""
+    if not ml_service.get_task_status(task_id):
+        raise HTTPException(404, "Task not found")
+    return StreamingResponse(
+        _task_events(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/results/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    status = ml_service.get_task_status(task_id)
+    if not status:
+        raise HTTPException(404, "Task not found")
+    if not ml_service.cancel_task(task_id):
+        raise HTTPException(409, f"Task is already {status['status']}")
+    return {"status": "cancelled", "task_id": task_id}
 
 
 @router.get("/results/{task_id}/download")
 async def download_results(task_id: str):
-    status = ml_service.get_task_status(task_id)
-    if not status or status["status"] != "completed":
-        raise HTTPException(404, "Results not ready")
+    status, df = await _completed_task(task_id)
 
-    df = status["result"]
-    output = io.StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
+    def rows():
+        for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start : start + EXPORT_CHUNK_ROWS]
+            yield chunk.to_csv(index=False, header=start == 0).encode()
 
+    body = rows()
+    if status.get("profiler") is not None:
+        body = status["profiler"].wrap_iter("serialize", body)
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        body,
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=results.csv"},
     )
 
 
-@router.post("/validate")
-async def validate_predictions(file: UploadFile = File(...)):
-    content = await file.read()
-    df = pd.read_csv(io.BytesIO(content))
+def _task_profiler(task_id: str) -> JobProfiler:
+    status = ml_service.get_task_status(task_id)
+    if not status:
+        raise HTTPException(404, "Task not found")
+    profiler = status.get("profiler")
+    if profiler is None:
+        raise HTTPException(404, "Profiling was not requested for this task")
+    return profiler
+
+
+@router.get("/results/{task_id}/profile")
+async def get_profile(task_id: str, top: int = Query(20, ge=1, le=500)):
+    """Время этапов и top-N функций и операций torch; доступно и до завершения"""
+    profiler = _task_profiler(task_id)
+    status = ml_service.get_task_status(task_id)["status"]
+    return {"task_id": task_id, "status": status, **profiler.summary(top)}
+
+
+@router.get("/results/{task_id}/profile/download")
+async def download_profile(task_id: str):
+    profiler = _task_profiler(task_id)
+    return Response(
+        profiler.artifact(),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=profile-{task_id}.zip"
+        },
+    )
 
-    if "label" not in df.columns or "true_label" not in df.columns:
-        raise HTTPException(400, "CSV must contain 'label' and 'true_label' columns")
 
-    metrics = ml_service.validate(df["true_label"], df["label"])
-    return metrics
+@router.post("/validate")
+async def validate_predictions(
+    file: UploadFile = File(...),
+    task_id: Optional[str] = Query(
+        None, description="Сравнить с результатом задачи вместо колонки label"
+    ),
+    id_column: Optional[str] = Query(
+        None, description="Колонка результата для сопоставления, иначе text_id"
+    ),
+    bootstrap: int = Query(
+        1000, ge=0, le=100_000, description="Выборок для интервала macro-F1"
+    ),
+):
+    path = await _save_upload(file, get_settings().max_file_size)
+    try:
+        try:
+            columns = pd.read_csv(path, nrows=0).columns
+        except Exception as e:
+            raise HTTPException(400, f"Invalid CSV: {str(e)}")
+
+        if task_id is None:
+            if "label" not in columns or "true_label" not in columns:
+                raise HTTPException(
+                    400, "CSV must contain 'label' and 'true_label' columns"
+                )
+        else:
+            _, df = await _completed_task(task_id)
+            key = id_column or "text_id"
+            if key not in columns or "true_label" not in columns:
+                raise HTTPException(
+                    400, f"CSV must contain '{key}' and 'true_label' columns"
+                )
+            if id_column and id_column not in df.columns:
+                raise HTTPException(400, f"Unknown fields: {id_column}")
+
+        try:
+            return await asyncio.to_thread(
+                ml_service.validate_csv, path, bootstrap, task_id, id_column
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+    finally:
+        os.remove(path)
 
 
 @router.get("/search")
-async def search_texts(task_id: str, query: str, source: Optional[str] = None):
-    status = ml_service.get_task_status(task_id)
-    if not status or status["status"] != "completed":
-        raise HTTPException(404, "Results not ready")
-
-    df = status["result"]
-    mask = df["text"].str.contains(query, case=False, na=False)
-    if source:
-        mask &= df["src"] == source
-
-    return {"results": df[mask].to_dict(orient="records")}
+async def search_texts(
+    task_id: str,
+    query: str,
+    source: Optional[str] = None,
+    label: Optional[int] = None,
+    page: Page = Depends(page_params),
+):
+    status, df = await _queryable_task(task_id)
+    index = status.get("index")
+    facets = status.get("facets")
+    if index is not None and facets is not None:
+        rows = index.lookup(query)
+        # Индекс выполняющейся задачи может опережать размеченные строки
+        rows = rows[: rows.searchsorted(len(df))]
+        allowed = facets.rows(label, source)
+        if allowed is not None:
+            rows = np.intersect1d(rows, allowed, assume_unique=True)
+        return _paginate(df.iloc[rows], page, "results")
+
+    df = df[df["text"].str.contains(query, case=False, na=False, regex=False)]
+    if source and "src" in df.columns:
+        df = df[df["src"] == source]
+    if label is not None:
+        df = df[df["label"] == label]
+    return _paginate(df, page, "results")
 
 
 @router.get("/filter")
 async def filter_results(
-    task_id: str, label: Optional[int] = None, source: Optional[str] = None
+    task_id: str,
+    label: Optional[int] = None,
+    source: Optional[str] = None,
+    page: Page = Depends(page_params),
 ):
-    status = ml_service.get_task_status(task_id)
-    if not status or status["status"] != "completed":
-        raise HTTPException(404, "Results not ready")
+    status, df = await _queryable_task(task_id)
+    facets = status.get("facets")
+    if facets is not None:
+        rows = facets.rows(label, source)
+        return _paginate(df if rows is None else df.iloc[rows], page, "results")
 
-    df = status["result"]
     if label is not None:
         df = df[df["label"] == label]
     if source and "src" in df.columns:
         df = df[df["src"] == source]
-
-    return {"results": df.to_dict(orient="records")}
+    return _paginate(df, page, "results")
 
 
 @router.patch("/results/{task_id}/correct")
@@ -126,16 +482,11 @@ async def manual_correction(task_id: str, text_id: int, new_label: int):
     if new_label not in [0, 1, 2]:
         raise HTTPException(400, "Label must be 0, 1, or 2")
 
-    status = ml_service.get_task_status(task_id)
-    if not status or status["status"] != "completed":
-        raise HTTPException(404, "Results not ready")
+    status, df = await _completed_task(task_id)
 
-    df = status["result"]
     if text_id < 0 or text_id >= len(df):
         raise HTTPException(404, "Text ID not found")
 
-    df.loc[text_id, "label"] = new_label
-    df.loc[text_id, "manually_corrected"] = True
-    status["result"] = df
+    ml_service.correct_label(status, df, text_id, new_label)
 
     return {"status": "updated", "text_id": text_id, "new_label": new_label}
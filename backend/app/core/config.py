@@ -7,8 +7,44 @@ class Settings(BaseSettings):
     app_name: str = "Sentiment Analyzer API"
     debug: bool = True
     model_name: str = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+    preload_model: bool = True
+    warmup_batches: int = 2
+    inference_backend: str = "torch"
+    onnx_dir: str = "data/onnx"
     max_file_size: int = 50 * 1024 * 1024
+    csv_chunk_rows: int = 10_000
+    default_page_size: int = 1000
+    max_page_size: int = 10_000
+    search_lemmas: bool = True
+    lemma_cache_size: int = 100_000
+    results_dir: str = "data/results"
+    result_ttl_seconds: int = 24 * 3600
+    results_max_disk_bytes: int = 10 * 1024**3
+    results_max_open: int = 16
     redis_url: str = "redis://localhost:6379"
+    execution_mode: str = "local"
+    celery_broker_url: str = ""
+    celery_eager: bool = False
+    redis_task_ttl: int = 24 * 3600
+    max_length: int = 512
+    max_batch_size: int = 64
+    max_tokens_per_batch: int = 8192
+    inference_chunk_size: int = 1024
+    inference_workers: int = 1
+    max_running_jobs: int = 2
+    inference_queue_size: int = 8
+    torch_threads: int = 0
+    inference_shards: int = 1
+    shard_torch_threads: int = 0
+    micro_batch_size: int = 32
+    micro_batch_wait_ms: float = 5.0
+    max_predict_texts: int = 64
+    cache_enabled: bool = True
+    cache_max_items: int = 100_000
+    cache_path: str = "data/prediction_cache.db"
+    events_heartbeat_seconds: float = 15.0
+    events_min_interval_ms: float = 250.0
+    events_poll_seconds: float = 1.0
 
     class Config:
         env_file = ".env"
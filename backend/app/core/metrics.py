@@ -0,0 +1,121 @@
+from typing import Any, Dict, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+TOKEN_BUCKETS = tuple(2**i for i in range(4, 18))
+
+INFERENCE_STAGE_SECONDS = Histogram(
+    "sentiment_inference_stage_seconds",
+    "Этап инференса: tokenize на вызов predict, pad/forward/postprocess на батч",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "sentiment_batch_size", "Текстов в батче модели", buckets=BATCH_BUCKETS
+)
+BATCH_TOKENS = Histogram(
+    "sentiment_batch_tokens",
+    "Токенов в батче: real — без паддинга, padded — форма тензора",
+    ["kind"],
+    buckets=TOKEN_BUCKETS,
+)
+TOKENS = Counter(
+    "sentiment_tokens",
+    "Токены, прошедшие через модель; rate() даёт токены/сек",
+    ["kind"],
+)
+TEXTS = Counter("sentiment_texts", "Тексты, прошедшие через модель")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "sentiment_http_request_duration_seconds",
+    "Время ответа маршрутов /api",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "sentiment_http_requests_in_progress",
+    "Запросы /api в обработке",
+    ["method", "route"],
+)
+
+
+class ServiceCollector:
+    """Состояние MLService, снимаемое в момент scrape: очередь задач,
+    память задач, хранилище результатов и кэши"""
+
+    def __init__(self, service: Any):
+        self.service = service
+
+    def collect(self) -> Iterator[Any]:
+        service = self.service
+        scheduler = service.scheduler.stats()
+        yield _gauge("sentiment_jobs_queued", "Задачи в очереди", scheduler["queued"])
+        yield _gauge(
+            "sentiment_jobs_running", "Выполняемые задачи", scheduler["running"]
+        )
+        yield _gauge(
+            "sentiment_inference_batches_active",
+            "Чанки, занявшие слот инференса",
+            scheduler["active_batches"],
+        )
+        yield _gauge(
+            "sentiment_executor_pending",
+            "Вызовы в пуле инференса, включая ожидающие",
+            service.executor.pending,
+        )
+
+        tasks = list(service.tasks.values())
+        by_status: Dict[str, int] = {}
+        for task in tasks:
+            status = task.get("status", "unknown")
+            by_status[status] = by_status.get(status, 0) + 1
+        family = GaugeMetricFamily(
+            "sentiment_tasks", "Задачи в памяти по статусу", labels=["status"]
+        )
+        for status, count in sorted(by_status.items()):
+            family.add_metric([status], count)
+        yield family
+        yield _gauge(
+            "sentiment_task_memory_bytes",
+            "Память индексов поиска и фасетов завершённых задач",
+            sum(task.get("memory_bytes", 0) for task in tasks),
+        )
+
+        store = service.results.stats()
+        yield _gauge(
+            "sentiment_result_store_bytes", "Результаты на диске", store["disk_bytes"]
+        )
+        yield _gauge(
+            "sentiment_result_store_open",
+            "Результаты, открытые через memory map",
+            store["open"],
+        )
+
+        if service.cache is not None:
+            yield from _cache_metrics(
+                "sentiment_prediction_cache", service.cache.stats()
+            )
+        lemma = service.preprocessor.lemma_stats()
+        yield from _cache_metrics(
+            "sentiment_lemma_cache",
+            {
+                "hits": lemma["cache_hits"],
+                "misses": lemma["parsed"],
+                "hit_rate": lemma["hit_rate"],
+            },
+        )
+
+
+def _gauge(name: str, documentation: str, value: float) -> GaugeMetricFamily:
+    return GaugeMetricFamily(name, documentation, value=value)
+
+
+def _cache_metrics(prefix: str, stats: Dict[str, float]) -> Iterator[Any]:
+    yield CounterMetricFamily(f"{prefix}_hits", "Попадания в кэш", value=stats["hits"])
+    yield CounterMetricFamily(f"{prefix}_misses", "Промахи кэша", value=stats["misses"])
+    yield _gauge(f"{prefix}_hit_rate", "Доля попаданий с запуска", stats["hit_rate"])
@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.routing import Match
 
 from .api.routes import router
 from .core.config import get_settings
+from .core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_PROGRESS
+from .services.ml_service import ml_service
+
+STARTED_AT = time.perf_counter()
 
 settings = get_settings()
+logger = logging.getLogger("uvicorn.error")
+
+MULTIPART_OVERHEAD = 64 * 1024
 
 app = FastAPI(
     title=settings.app_name,
@@ -23,6 +37,72 @@ app.add_middleware(
 app.include_router(router)
 
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Отклоняем заведомо слишком большие загрузки до разбора multipart-тела
+    content_length = request.headers.get("content-length")
+    if (
+        request.url.path == "/api/analyze"
+        and content_length
+        and content_length.isdigit()
+        and int(content_length) > settings.max_file_size + MULTIPART_OVERHEAD
+    ):
+        return JSONResponse(
+            {"detail": f"File exceeds {settings.max_file_size} bytes"}, status_code=413
+        )
+    return await call_next(request)
+
+
+def _route_template(request: Request) -> str:
+    # Шаблон маршрута вместо пути, чтобы task_id не плодил временные ряды
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def track_api_latency(request: Request, call_next):
+    if not request.url.path.startswith("/api"):
+        return await call_next(request)
+
+    route = _route_template(request)
+    in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(request.method, route)
+    in_progress.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(
+            time.perf_counter() - start
+        )
+
+
+async def _warm_up():
+    try:
+        timings = await asyncio.to_thread(ml_service.startup, STARTED_AT)
+    except Exception:
+        logger.exception("Startup failed")
+        return
+    logger.info("Ready to serve, startup timings (s): %s", timings)
+
+
+@app.on_event("startup")
+async def startup():
+    # Модель грузится в фоне: /health отвечает сразу, /ready — после прогрева
+    app.state.warmup = asyncio.create_task(_warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    ml_service.shutdown()
+
+
 @app.get("/")
 async def root():
     return {"message": "Sentiment Analyzer API", "docs": "/docs"}
@@ -31,3 +111,19 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/ready")
+async def ready():
+    if ml_service.ready:
+        return {"status": "ready", "startup_seconds": ml_service.startup_timings}
+    if ml_service.startup_error:
+        return JSONResponse(
+            {"status": "failed", "error": ml_service.startup_error}, status_code=503
+        )
+    return JSONResponse({"status": "starting"}, status_code=503)
@@ -0,0 +1,30 @@
+from typing import List, Sequence
+
+
+def token_budget_batches(
+    lengths: Sequence[int], max_tokens: int, max_batch_size: int
+) -> List[List[int]]:
+    """Группирует индексы текстов в батчи по длине в токенах.
+
+    Тексты сортируются по убыванию длины, поэтому первый элемент батча задаёт
+    его ширину после паддинга. Батч закрывается, когда ширина * размер
+    превышает max_tokens или размер достигает max_batch_size.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    width = 0
+    for idx in order:
+        if batch and (
+            len(batch) >= max_batch_size or width * (len(batch) + 1) > max_tokens
+        ):
+            batches.append(batch)
+            batch = []
+        if not batch:
+            width = max(lengths[idx], 1)
+        batch.append(idx)
+
+    if batch:
+        batches.append(batch)
+    return batches
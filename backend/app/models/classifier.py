@@ -1,37 +1,242 @@
+import hashlib
+import os
+import threading
+import time
+
 import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from typing import List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..core.metrics import (
+    BATCH_SIZE,
+    BATCH_TOKENS,
+    INFERENCE_STAGE_SECONDS,
+    TEXTS,
+    TOKENS,
+)
+from .batching import token_budget_batches
+
+BACKENDS = ("torch", "torch_int8", "onnx", "onnx_int8")
+
+
+class _PositionalInputs(torch.nn.Module):
+    """Обёртка для экспорта в ONNX: входы по порядку имён вместо kwargs"""
+
+    def __init__(self, model: torch.nn.Module, names: List[str]):
+        super().__init__()
+        self.model = model
+        self.names = names
+
+    def forward(self, *inputs: torch.Tensor) -> torch.Tensor:
+        return self.model(**dict(zip(self.names, inputs))).logits
+
+
+def _write_atomic(path: str, write: Callable[[str], None]):
+    """Пишет файл под временным именем и переносит на место одним rename.
+
+    Шарды и Celery-воркеры стартуют одновременно: каждый либо видит
+    готовый файл, либо пишет свой и заменяет им целый, но не дописывает
+    в чужой.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _export_onnx(model_name: str, path: str):
+    """Экспорт HF-модели; torch-модель живёт только на время экспорта"""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["пример текста", "ok"], padding=True, return_tensors="pt")
+    names = list(sample.keys())
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["logits"] = {0: "batch"}
+    torch.onnx.export(
+        _PositionalInputs(model, names),
+        tuple(sample[name] for name in names),
+        path,
+        input_names=names,
+        output_names=["logits"],
+        dynamic_axes=axes,
+        opset_version=17,
+        dynamo=False,
+    )
+
+
+def model_fingerprint(model_name: str) -> str:
+    """Отпечаток весов: имена, размеры и mtime файлов каталога модели.
+
+    Для модели с Hub берётся её снапшот в локальном кэше HF, каталог
+    которого назван хэшем коммита. Переобучение в тот же локальный путь
+    или новая ревизия на Hub дают новый отпечаток.
+    """
+    directory = model_name
+    if not os.path.isdir(directory):
+        from transformers.utils import cached_file
+
+        directory = os.path.dirname(cached_file(model_name, "config.json"))
+    digest = hashlib.sha1(os.path.realpath(directory).encode())
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_file():
+            stat = entry.stat()
+            digest.update(
+                f"\0{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}".encode()
+            )
+    return digest.hexdigest()[:16]
+
+
+def prepare_onnx(model_name: str, onnx_dir: str, quantize: bool) -> str:
+    """Путь к ONNX-файлу модели; экспортирует и квантует при первом вызове.
+
+    Каталог экспорта привязан к отпечатку весов, поэтому обновлённая
+    модель экспортируется заново, а не подменяется старым файлом.
+    """
+    slug = model_name.strip("/").replace("/", "--")
+    model_dir = os.path.join(onnx_dir, f"{slug}-{model_fingerprint(model_name)}")
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, "model.onnx")
+    if not os.path.exists(path):
+        _write_atomic(path, lambda tmp: _export_onnx(model_name, tmp))
+    if not quantize:
+        return path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+    if not os.path.exists(int8_path):
+        _write_atomic(
+            int8_path,
+            lambda tmp: quantize_dynamic(path, tmp, weight_type=QuantType.QInt8),
+        )
+    return int8_path
 
 
 class SentimentClassifier:
-    def __init__(self, model_name: str = "cardiffnlp/twitter-xlm-roberta-base-sentiment"):
+    def __init__(
+        self,
+        model_name: str = "cardiffnlp/twitter-xlm-roberta-base-sentiment",
+        max_length: int = 512,
+        max_tokens_per_batch: int = 8192,
+        num_threads: int = 0,
+        backend: str = "torch",
+        onnx_dir: str = "data/onnx",
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected {BACKENDS}")
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if backend != "torch":
+            # int8 и onnxruntime рассчитаны на CPU-ноды
+            self.device = torch.device("cpu")
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
-        self.model.to(self.device)
-        self.model.eval()
+        # Для onnx-бэкендов torch-модель не держится в памяти: при наличии
+        # готового файла она не грузится вовсе
+        self.model: Optional[torch.nn.Module] = None
+        if not backend.startswith("onnx"):
+            self.model = AutoModelForSequenceClassification.from_pretrained(
+                model_name
+            )
+            self.model.to(self.device)
+            self.model.eval()
         self.model_name = model_name
+        self.backend = backend
+        self.max_length = max_length
+        self.max_tokens_per_batch = max_tokens_per_batch
         self.label_map = {0: 0, 1: 1, 2: 2}
+        # Fast-токенизаторы HF не потокобезопасны при вызове из нескольких потоков
+        self._tokenizer_lock = threading.Lock()
 
-    def predict(self, texts: List[str], batch_size: int = 32) -> List[Tuple[int, float]]:
-        results = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
+        self._session = None
+        if backend == "torch_int8":
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif backend.startswith("onnx"):
+            self._session = self._load_onnx(
+                onnx_dir, quantize=backend == "onnx_int8", num_threads=num_threads
+            )
+            self._onnx_inputs = [i.name for i in self._session.get_inputs()]
+
+    def _load_onnx(self, onnx_dir: str, quantize: bool, num_threads: int):
+        import onnxruntime as ort
+
+        path = prepare_onnx(self.model_name, onnx_dir, quantize)
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def _forward(self, inputs: Dict[str, torch.Tensor]) -> torch.Tensor:
+        if self._session is not None:
+            feeds = {name: inputs[name].numpy() for name in self._onnx_inputs}
+            return torch.from_numpy(self._session.run(["logits"], feeds)[0])
+        return self.model(**inputs).logits
+
+    def predict(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        max_tokens: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        if not texts:
+            return []
+        max_tokens = max_tokens or self.max_tokens_per_batch
+
+        start = time.perf_counter()
+        with self._tokenizer_lock:
             encoded = self.tokenizer(
-                batch, padding=True, truncation=True, max_length=512, return_tensors="pt"
+                texts, padding=False, truncation=True, max_length=self.max_length
             )
-            encoded = {k: v.to(self.device) for k, v in encoded.items()}
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        INFERENCE_STAGE_SECONDS.labels("tokenize").observe(time.perf_counter() - start)
+
+        results: List[Optional[Tuple[int, float]]] = [None] * len(texts)
+        for batch in token_budget_batches(lengths, max_tokens, batch_size):
+            start = time.perf_counter()
+            features = {k: [encoded[k][i] for i in batch] for k in encoded.keys()}
+            with self._tokenizer_lock:
+                padded = self.tokenizer.pad(
+                    features, padding=True, return_tensors="pt"
+                )
+            padded = {k: v.to(self.device) for k, v in padded.items()}
+            mark = time.perf_counter()
+            INFERENCE_STAGE_SECONDS.labels("pad").observe(mark - start)
 
             with torch.no_grad():
-                outputs = self.model(**encoded)
-                probs = torch.softmax(outputs.logits, dim=-1)
-                preds = torch.argmax(probs, dim=-1)
-                confidences = torch.max(probs, dim=-1).values
+                logits = self._forward(padded)
+                start = time.perf_counter()
+                INFERENCE_STAGE_SECONDS.labels("forward").observe(start - mark)
+                probs = torch.softmax(logits, dim=-1)
+                confidences, preds = torch.max(probs, dim=-1)
 
-            for pred, conf in zip(preds.cpu().numpy(), confidences.cpu().numpy()):
+            for idx, pred, conf in zip(
+                batch, preds.cpu().numpy(), confidences.cpu().numpy()
+            ):
                 label = self.label_map.get(int(pred), 1)
-                results.append((label, float(conf)))
+                results[idx] = (label, float(conf))
+            INFERENCE_STAGE_SECONDS.labels("postprocess").observe(
+                time.perf_counter() - start
+            )
+            self._observe_batch(batch, lengths, padded["input_ids"].numel())
         return results
 
+    @staticmethod
+    def _observe_batch(batch: List[int], lengths: List[int], padded_tokens: int):
+        real_tokens = sum(lengths[i] for i in batch)
+        BATCH_SIZE.observe(len(batch))
+        BATCH_TOKENS.labels("real").observe(real_tokens)
+        BATCH_TOKENS.labels("padded").observe(padded_tokens)
+        TOKENS.labels("real").inc(real_tokens)
+        TOKENS.labels("padded").inc(padded_tokens)
+        TEXTS.inc(len(batch))
+
     def predict_single(self, text: str) -> Tuple[int, float]:
         return self.predict([text])[0]
@@ -1,18 +1,45 @@
 import re
-import pymorphy3
-import nltk
+from functools import lru_cache
+from typing import Dict, List
 
-nltk.download("stopwords", quiet=True)
-nltk.download("punkt", quiet=True)
+
+def load_stopwords(language: str = "russian") -> set:
+    """Стоп-слова из локальных данных NLTK (NLTK_DATA), без обращения к сети"""
+    from nltk.corpus import stopwords
+
+    try:
+        return set(stopwords.words(language))
+    except (LookupError, OSError):
+        return set()
 
 
 class TextPreprocessor:
-    def __init__(self):
-        self.morph = pymorphy3.MorphAnalyzer()
-        try:
-            self.stopwords = set(nltk.corpus.stopwords.words("russian"))
-        except:
-            self.stopwords = set()
+    def __init__(self, lemma_cache_size: int = 100_000):
+        # pymorphy3 и словари грузятся при первом обращении или в load()
+        self._morph = None
+        self._stopwords = None
+        # Частоты слов распределены по Ципфу: несколько тысяч слов покрывают
+        # большую часть словоупотреблений, поэтому разбор кэшируется по слову
+        self._lemma = lru_cache(maxsize=lemma_cache_size)(self._parse_lemma)
+        self._lemma_tokens = 0
+
+    @property
+    def morph(self):
+        if self._morph is None:
+            import pymorphy3
+
+            self._morph = pymorphy3.MorphAnalyzer()
+        return self._morph
+
+    @property
+    def stopwords(self) -> set:
+        if self._stopwords is None:
+            self._stopwords = load_stopwords()
+        return self._stopwords
+
+    def load(self):
+        self.morph
+        self.stopwords
 
     def clean_text(self, text: str) -> str:
         if not isinstance(text, str):
@@ -22,10 +49,34 @@ class TextPreprocessor:
         text = text.lower().strip()
         return text
 
+    def _parse_lemma(self, word: str) -> str:
+        return self.morph.parse(word)[0].normal_form
+
     def lemmatize(self, text: str) -> str:
         words = text.split()
-        lemmas = [self.morph.parse(w)[0].normal_form for w in words]
-        return " ".join(lemmas)
+        self._lemma_tokens += len(words)
+        return " ".join([self._lemma(w) for w in words])
+
+    def lemmatize_batch(self, texts: List[str]) -> List[str]:
+        """Лемматизирует список текстов, разбирая каждое уникальное слово один раз"""
+        tokenized = [text.split() for text in texts]
+        self._lemma_tokens += sum(map(len, tokenized))
+        vocab = {w for words in tokenized for w in words}
+        lemmas = {w: self._lemma(w) for w in vocab}
+        return [" ".join([lemmas[w] for w in words]) for words in tokenized]
+
+    def lemma_stats(self) -> Dict[str, float]:
+        """tokens — всего слов, parsed — сколько из них разобрал pymorphy3"""
+        info = self._lemma.cache_info()
+        tokens = self._lemma_tokens
+        return {
+            "tokens": tokens,
+            "parsed": info.misses,
+            "cache_hits": info.hits,
+            "hit_rate": 1 - info.misses / tokens if tokens else 0.0,
+            "cache_size": info.currsize,
+            "cache_max_size": info.maxsize,
+        }
 
     def remove_stopwords(self, text: str) -> str:
         words = text.split()
@@ -37,3 +88,9 @@ class TextPreprocessor:
         if lemmatize:
             text = self.lemmatize(text)
         return text
+
+    def preprocess_batch(self, texts: List[str], lemmatize: bool = False) -> List[str]:
+        cleaned = [self.clean_text(text) for text in texts]
+        if lemmatize:
+            cleaned = self.lemmatize_batch(cleaned)
+        return cleaned
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Prediction = Tuple[int, float]
+
+
+class PredictionCache:
+    """Кэш предсказаний: LRU в памяти поверх таблицы SQLite на диске.
+
+    Ключ — sha1 от имени модели и нормализованного текста, поэтому
+    повторяющиеся отзывы (в том числе из разных загрузок) не гоняются
+    через модель заново.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        normalize: Callable[[str], str],
+        max_items: int = 100_000,
+        path: Optional[str] = None,
+    ):
+        self.namespace = namespace
+        self.normalize = normalize
+        self.max_items = max_items
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Prediction]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Соединение с SQLite, открытое в текущем процессе; вызывать под _lock.
+
+        Сервис создаётся при импорте, и соединение, открытое в конструкторе,
+        унаследовали бы форкнутые воркеры Celery. Поэтому оно открывается при
+        первом обращении, а в дочернем процессе — заново.
+        """
+        if not self.path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, label INTEGER, confidence REAL)"
+            )
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def key(self, text: str) -> str:
+        normalized = self.normalize(text) or text
+        return hashlib.sha1(f"{self.namespace}\0{normalized}".encode()).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Prediction]:
+        found: Dict[str, Prediction] = {}
+        missing: List[str] = []
+        requested = 0
+        with self._lock:
+            for key in keys:
+                requested += 1
+                value = self._memory.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = value
+
+            db = self._connection() if missing else None
+            if db is not None:
+                for start in range(0, len(missing), 500):
+                    part = missing[start : start + 500]
+                    rows = db.execute(
+                        "SELECT key, label, confidence FROM predictions "
+                        f"WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    for key, label, confidence in rows:
+                        found[key] = (label, confidence)
+                        self._remember(key, (label, confidence))
+                    self.disk_hits += len(rows)
+
+            self.hits += len(found)
+            self.misses += requested - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Prediction]):
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+            db = self._connection()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                    [(k, int(v[0]), float(v[1])) for k, v in items.items()],
+                )
+                db.commit()
+
+    def _remember(self, key: str, value: Prediction):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+    def close(self):
+        # Чужое соединение, унаследованное при форке, не закрывается:
+        # им продолжает пользоваться родитель
+        if self._db is not None and self._db_pid == os.getpid():
+            self._db.close()
+        self._db = None
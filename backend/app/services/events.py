@@ -0,0 +1,50 @@
+import asyncio
+from typing import Dict
+
+
+class TaskEvents:
+    """Версии состояния задач для push-уведомлений о прогрессе.
+
+    Подписчик ждёт, пока версия задачи уйдёт дальше увиденной, и сам читает
+    текущее состояние. Очереди событий нет: медленный клиент пропускает
+    промежуточные обновления, а не копит их в памяти сервера.
+    Вызывается только из event loop.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._changed: Dict[str, asyncio.Event] = {}
+
+    def version(self, task_id: str) -> int:
+        return self._versions.get(task_id, 0) + self._epoch
+
+    def notify(self, task_id: str):
+        self._versions[task_id] = self._versions.get(task_id, 0) + 1
+        event = self._changed.pop(task_id, None)
+        if event is not None:
+            event.set()
+
+    def notify_all(self):
+        """Изменение очереди планировщика затрагивает позиции всех задач"""
+        self._epoch += 1
+        changed, self._changed = self._changed, {}
+        for event in changed.values():
+            event.set()
+
+    async def wait(self, task_id: str, seen: int, timeout: float) -> bool:
+        """Ждёт изменения задачи после версии seen; False — по таймауту"""
+        if self.version(task_id) != seen:
+            return True
+        event = self._changed.setdefault(task_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def forget(self, task_id: str):
+        self._versions.pop(task_id, None)
+        event = self._changed.pop(task_id, None)
+        if event is not None:
+            event.set()
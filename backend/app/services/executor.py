@@ -0,0 +1,39 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class InferenceExecutor:
+    """Пул потоков для блокирующего инференса с ограниченной очередью задач.
+
+    Корутины ждут результата через run(), не блокируя event loop. Если в пуле
+    и очереди уже max_workers + max_queue задач, новые вызовы ждут свободного
+    слота, а не копятся в памяти.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 8):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+
+        self.pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._pool, functools.partial(fn, *args, **kwargs)
+                )
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
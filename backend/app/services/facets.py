@@ -0,0 +1,157 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LABEL_NAMES = {0: "negative", 1: "neutral", 2: "positive"}
+
+
+class FacetIndex:
+    """Номера строк по метке, источнику и их паре плюс готовые счётчики меток.
+
+    Пополняется чанками по ходу разметки через extend(); ручная корректировка
+    меток обновляет его через relabel() без пересчёта по всему датасету.
+    """
+
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.counts: Dict[int, int] = {}
+        self.by_label: Dict[int, np.ndarray] = {}
+        self.by_src: Dict[Any, np.ndarray] = {}
+        self.by_label_src: Dict[Tuple[int, Any], np.ndarray] = {}
+        self.src_of: Optional[np.ndarray] = None
+        self._pending: List["FacetIndex"] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "FacetIndex":
+        facets = cls()
+        facets.extend(df)
+        facets._merge()
+        return facets
+
+    @classmethod
+    def _chunk(cls, df: pd.DataFrame, offset: int) -> "FacetIndex":
+        part = cls(len(df))
+        frame = df.reset_index(drop=True)
+        part.by_label = {
+            int(label): rows.astype(np.int64) + offset
+            for label, rows in frame.groupby("label", sort=True).indices.items()
+        }
+        part.counts = {label: len(rows) for label, rows in part.by_label.items()}
+        if "src" in frame.columns:
+            part.src_of = frame["src"].to_numpy()
+            part.by_src = {
+                src: rows.astype(np.int64) + offset
+                for src, rows in frame.groupby("src", sort=False).indices.items()
+            }
+            part.by_label_src = {
+                (int(label), src): rows.astype(np.int64) + offset
+                for (label, src), rows in frame.groupby(
+                    ["label", "src"], sort=False
+                ).indices.items()
+            }
+        return part
+
+    def extend(self, df: pd.DataFrame):
+        """Дописывает строки следующего чанка.
+
+        Группируется только сам чанк, счётчики меток обновляются сразу,
+        а склейка номеров строк откладывается до первого запроса строк,
+        чтобы частые дописывания не копировали индекс целиком.
+        """
+        part = self._chunk(df, self.total)
+        with self._lock:
+            self._pending.append(part)
+            self.total += part.total
+            for label, count in part.counts.items():
+                self.counts[label] = self.counts.get(label, 0) + count
+
+    def _merge(self):
+        with self._lock:
+            if not self._pending:
+                return
+            parts, self._pending = [self, *self._pending], []
+            self.by_label = _concat(part.by_label for part in parts)
+            self.by_src = _concat(part.by_src for part in parts)
+            self.by_label_src = _concat(part.by_label_src for part in parts)
+            sources = [part.src_of for part in parts if part.src_of is not None]
+            if sources:
+                self.src_of = np.concatenate(sources)
+
+    def rows(
+        self, label: Optional[int] = None, src: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """Отсортированные номера строк под фильтр; None означает «все строки»"""
+        self._merge()
+        empty = np.empty(0, dtype=np.int64)
+        # Без колонки src фильтр по источнику не применяется, как и в
+        # полном сканировании
+        if src and self.src_of is None:
+            src = None
+        if label is not None and src:
+            return self.by_label_src.get((label, src), empty)
+        if label is not None:
+            return self.by_label.get(label, empty)
+        if src:
+            return self.by_src.get(src, empty)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        stats = {"total": self.total}
+        for label, name in LABEL_NAMES.items():
+            stats[name] = self.counts.get(label, 0)
+        return stats
+
+    def nbytes(self) -> int:
+        """Размер массивов номеров строк"""
+        self._merge()
+        arrays = [*self.by_label.values(), *self.by_src.values()]
+        arrays += self.by_label_src.values()
+        if self.src_of is not None:
+            arrays.append(self.src_of)
+        return sum(rows.nbytes for rows in arrays)
+
+    def relabel(self, row: int, old: int, new: int):
+        if old == new:
+            return
+        self._merge()
+        self.counts[old] = self.counts.get(old, 0) - 1
+        self.counts[new] = self.counts.get(new, 0) + 1
+        self.by_label[old] = _remove(self.by_label.get(old), row)
+        self.by_label[new] = _insert(self.by_label.get(new), row)
+        if self.src_of is not None and not pd.isna(self.src_of[row]):
+            src = self.src_of[row]
+            pairs = self.by_label_src
+            pairs[(old, src)] = _remove(pairs.get((old, src)), row)
+            pairs[(new, src)] = _insert(pairs.get((new, src)), row)
+
+
+def _concat(groups: Iterable[Dict[Any, np.ndarray]]) -> Dict[Any, np.ndarray]:
+    parts: Dict[Any, List[np.ndarray]] = {}
+    for group in groups:
+        for key, rows in group.items():
+            parts.setdefault(key, []).append(rows)
+    return {
+        key: rows[0] if len(rows) == 1 else np.concatenate(rows)
+        for key, rows in parts.items()
+    }
+
+
+def _remove(rows: Optional[np.ndarray], row: int) -> np.ndarray:
+    if rows is None:
+        return np.empty(0, dtype=np.int64)
+    pos = np.searchsorted(rows, row)
+    if pos < len(rows) and rows[pos] == row:
+        return np.delete(rows, pos)
+    return rows
+
+
+def _insert(rows: Optional[np.ndarray], row: int) -> np.ndarray:
+    if rows is None:
+        return np.array([row], dtype=np.int64)
+    pos = np.searchsorted(rows, row)
+    if pos < len(rows) and rows[pos] == row:
+        return rows
+    return np.insert(rows, pos, row)
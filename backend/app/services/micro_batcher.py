@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """Склеивает одновременные онлайн-запросы в один батч для модели.
+
+    Первый текст в очереди открывает окно ожидания max_wait_ms. Всё, что
+    успело прийти за это время (но не больше max_batch_size), уходит в
+    predict_fn одним вызовом, и каждый вызывающий получает свой результат.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[str]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, texts: List[str]) -> List[Any]:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        for text, future in zip(texts, futures):
+            self._queue.put_nowait((text, future))
+        return list(await asyncio.gather(*futures))
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await self.predict_fn([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
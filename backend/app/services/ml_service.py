@@ -1,65 +1,601 @@
 import asyncio
-from typing import Any, Dict, Optional
+import os
+import threading
+import time
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
+import numpy as np
 import pandas as pd
-from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
 
-from ..models.classifier import SentimentClassifier
+from prometheus_client import REGISTRY
+
+from ..core.config import get_settings
+from ..core.metrics import ServiceCollector
 from ..models.preprocessing import TextPreprocessor
+from .cache import PredictionCache
+from .events import TaskEvents
+from .executor import InferenceExecutor
+from .facets import FacetIndex
+from .micro_batcher import MicroBatcher
+from .partial import LabelBlock, PartialResult
+from .profiling import JobProfiler, profiled
+from .result_store import ResultStore
+from .scheduler import JobScheduler
+from .sharding import ShardPool
+from .task_store import RedisTaskStore
+from .text_index import InvertedIndex
+from .validation import task_predictions, validate_chunks
+
+if TYPE_CHECKING:
+    from ..models.classifier import SentimentClassifier
+
+WARMUP_TEXTS = [
+    "ок",
+    "Нормальный товар, доставка вовремя",
+    "Курьер опоздал на два часа, упаковка порвана, но сам товар в порядке. " * 4,
+]
 
 
 class MLService:
     def __init__(self):
-        self.classifier: Optional[SentimentClassifier] = None
-        self.preprocessor = TextPreprocessor()
+        self.classifier: Optional["SentimentClassifier"] = None
+        settings = get_settings()
+        self.preprocessor = TextPreprocessor(settings.lemma_cache_size)
         self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.events = TaskEvents()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.executor = InferenceExecutor(
+            max(settings.inference_workers, settings.inference_shards),
+            settings.inference_queue_size,
+        )
+        self.scheduler = JobScheduler(
+            settings.max_running_jobs, self.executor.max_workers
+        )
+        self.shards: Optional[ShardPool] = None
+        self._model_lock = threading.Lock()
+        self.store: Optional[RedisTaskStore] = None
+        if settings.execution_mode == "distributed":
+            self.store = RedisTaskStore.from_url(
+                settings.redis_url, settings.redis_task_ttl
+            )
+        self.cache: Optional[PredictionCache] = None
+        if settings.cache_enabled:
+            self.cache = PredictionCache(
+                f"{settings.model_name}:{settings.inference_backend}",
+                self.preprocessor.clean_text,
+                settings.cache_max_items,
+                settings.cache_path or None,
+            )
+        self.results = ResultStore(
+            settings.results_dir,
+            settings.result_ttl_seconds,
+            settings.results_max_disk_bytes,
+            settings.results_max_open,
+            on_evict=self._forget,
+        )
+        self.micro_batcher = MicroBatcher(
+            self._predict_batch,
+            settings.micro_batch_size,
+            settings.micro_batch_wait_ms,
+        )
+        self.ready = False
+        self.startup_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
 
     def load_model(self):
-        if self.classifier is None:
-            self.classifier = SentimentClassifier()
+        with self._model_lock:
+            if self.classifier is not None or self.shards is not None:
+                return
+            settings = get_settings()
+            kwargs = dict(
+                model_name=settings.model_name,
+                max_length=settings.max_length,
+                max_tokens_per_batch=settings.max_tokens_per_batch,
+                num_threads=settings.torch_threads,
+                backend=settings.inference_backend,
+                onnx_dir=settings.onnx_dir,
+            )
+            # transformers и torch импортируются только здесь
+            from ..models.classifier import (
+                SentimentClassifier,
+                model_fingerprint,
+                prepare_onnx,
+            )
+
+            if settings.inference_shards > 1:
+                if settings.inference_backend.startswith("onnx"):
+                    # Экспорт один раз в родителе, шарды находят готовый файл
+                    prepare_onnx(
+                        settings.model_name,
+                        settings.onnx_dir,
+                        settings.inference_backend == "onnx_int8",
+                    )
+                self.shards = ShardPool(
+                    settings.inference_shards, settings.shard_torch_threads, kwargs
+                )
+            else:
+                self.classifier = SentimentClassifier(**kwargs)
+            if self.cache is not None:
+                # Веса уже на диске; переобученная по тому же пути модель
+                # не получит предсказания старой из кэша
+                self.cache.namespace = (
+                    f"{settings.model_name}:{settings.inference_backend}:"
+                    f"{model_fingerprint(settings.model_name)}"
+                )
+
+    def warmup(self, batches: int):
+        """Пробные батчи мимо кэша, чтобы первый запрос не платил за инициализацию"""
+        if batches <= 0:
+            return
+        texts = WARMUP_TEXTS * 4
+        if self.shards is not None:
+            self.shards.warmup(texts, get_settings().max_batch_size)
+            batches -= 1
+        for _ in range(batches):
+            self._infer(texts)
+
+    def startup(self, started_at: Optional[float] = None) -> Dict[str, float]:
+        """Загружает словари и модель и прогревает инференс; замеряет этапы"""
+        settings = get_settings()
+        timings: Dict[str, float] = {}
+        begin = time.perf_counter()
+        try:
+            self.preprocessor.load()
+            timings["preprocessor"] = time.perf_counter() - begin
+            if settings.preload_model:
+                mark = time.perf_counter()
+                self.load_model()
+                timings["model"] = time.perf_counter() - mark
+                mark = time.perf_counter()
+                self.warmup(settings.warmup_batches)
+                timings["warmup"] = time.perf_counter() - mark
+        except Exception as e:
+            self.startup_error = str(e)
+            raise
+        timings["total"] = time.perf_counter() - (started_at or begin)
+        self.startup_timings = {k: round(v, 3) for k, v in timings.items()}
+        self.ready = True
+        return self.startup_timings
 
-    async def analyze_dataframe(self, df: pd.DataFrame, task_id: str) -> pd.DataFrame:
+    def _infer(self, texts: List[str]) -> List[Tuple[int, float]]:
+        batch_size = get_settings().max_batch_size
+        if self.shards is not None:
+            return self.shards.predict(texts, batch_size)
+        return self.classifier.predict(texts, batch_size)
+
+    def predict_cached(self, texts: List[str]) -> List[Tuple[int, float]]:
         self.load_model()
-        texts = df["text"].fillna("").tolist()
-        total = len(texts)
-
-        self.tasks[task_id] = {"status": "processing", "progress": 0, "total": total}
-
-        results = []
-        batch_size = 32
-        for i in range(0, total, batch_size):
-            batch = texts[i : i + batch_size]
-            batch_results = self.classifier.predict(batch)
-            results.extend(batch_results)
-            self.tasks[task_id]["progress"] = min(i + batch_size, total)
-            await asyncio.sleep(0)
-
-        df["label"] = [r[0] for r in results]
-        df["confidence"] = [r[1] for r in results]
-        self.tasks[task_id]["status"] = "completed"
-        self.tasks[task_id]["result"] = df
+        if self.cache is None:
+            return self._infer(texts)
+
+        keys = [self.cache.key(t) for t in texts]
+        found = self.cache.get_many(set(keys))
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            predictions = self._infer(list(missing.values()))
+            computed = dict(zip(missing.keys(), predictions))
+            self.cache.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def create_task(
+        self, task_id: str, total: int = 0, profile: Optional[str] = None
+    ) -> Dict[str, Any]:
+        self._remember_loop()
+        task = {
+            "task_id": task_id,
+            "status": "processing",
+            "progress": 0,
+            "total": total,
+        }
+        if profile:
+            task["profiler"] = JobProfiler(profile)
+        if self.store is None:
+            task["partial"] = PartialResult(self.new_index())
+        self.tasks[task_id] = task
+        if self.store is not None:
+            self.store.create(task_id, total=total)
+        return task
+
+    async def _label_frames(
+        self, frames: AsyncIterator[pd.DataFrame], task: Dict[str, Any]
+    ) -> PartialResult:
+        """Размечает поток CSV-чанков конвейером.
+
+        Чанки инференса уходят в executor одновременно, в том числе из
+        соседних CSV-чанков: следующий CSV-чанк читается, пока в работе
+        меньше двух чанков инференса на воркер, поэтому на границе
+        CSV-чанков конвейер не пустеет, а память ограничена. Очерёдность
+        между задачами определяет планировщик. Готовые строки попадают
+        в partial строго в порядке файла. Ошибка любого чанка отменяет
+        остальные.
+        """
+        task_id = task["task_id"]
+        partial = task.get("partial")
+        if partial is None:
+            partial = PartialResult(self.new_index())
+        chunk_size = get_settings().inference_chunk_size
+        limit = 2 * self.executor.max_workers
+        predict = profiled(task.get("profiler"), "inference", self.predict_cached)
+        blocks: Deque[LabelBlock] = deque()
+        running: Set[asyncio.Task] = set()
+        indexing: Optional[asyncio.Task] = None
+        extend_index = profiled(task.get("profiler"), "index", partial.index.extend)
+
+        def publish():
+            while blocks:
+                rows = blocks[0].take_ready()
+                if rows is not None:
+                    partial.append(rows)
+                if not blocks[0].done:
+                    return
+                blocks.popleft()
+
+        async def score(block: LabelBlock, start: int):
+            texts = block.texts(start)
+            async with self.scheduler.turn(task_id, len(texts)):
+                results = await self.executor.run(predict, texts)
+            task["progress"] += block.fill(start, results)
+            publish()
+            self.events.notify(task_id)
+
+        async def index_block(previous: Optional[asyncio.Task], texts: pd.Series):
+            # Индекс дописывается строго по порядку CSV-чанков
+            if previous is not None:
+                await previous
+            await asyncio.to_thread(extend_index, texts)
+
+        async def drain(size: int):
+            nonlocal running
+            while len(running) > size:
+                done, running = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for finished in done:
+                    finished.result()
+
+        try:
+            async for df in frames:
+                block = LabelBlock(df, chunk_size)
+                blocks.append(block)
+                indexing = asyncio.create_task(index_block(indexing, df["text"]))
+                running.update(
+                    asyncio.create_task(score(block, start))
+                    for start in block.starts()
+                )
+                publish()
+                await drain(limit - 1)
+            await drain(0)
+            if indexing is not None:
+                await indexing
+        except BaseException:
+            # Чанки, ждущие слота в планировщике, иначе остались бы в его
+            # очереди вместе с данными чанка
+            if indexing is not None:
+                running.add(indexing)
+            for pending in running:
+                pending.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+        return partial
+
+    async def analyze_dataframe(
+        self, df: pd.DataFrame, task_id: str, profile: Optional[str] = None
+    ) -> pd.DataFrame:
+        task = self.create_task(task_id, len(df), profile)
+        started = time.perf_counter()
+
+        async def frames():
+            yield df
+
+        df = (await self._label_frames(frames(), task)).frame()
+        await self._complete(task, df)
+        if "profiler" in task:
+            task["profiler"].record("job", time.perf_counter() - started)
         return df
 
-    def validate(self, y_true, y_pred) -> Dict[str, Any]:
-        return {
-            "macro_f1": float(f1_score(y_true, y_pred, average="macro")),
-            "precision": {
-                i: float(p)
-                for i, p in enumerate(
-                    precision_score(y_true, y_pred, average=None, zero_division=0)
+    def new_index(self) -> InvertedIndex:
+        lemmatize = None
+        if get_settings().search_lemmas:
+            lemmatize = self.preprocessor.lemmatize
+        return InvertedIndex(self.preprocessor.clean_text, lemmatize)
+
+    def _build_lookups(self, task: Dict[str, Any], df: pd.DataFrame):
+        partial = task.get("partial")
+        index = None
+        if partial is not None and len(partial) == len(df):
+            # Фасеты, счётчики меток и индекс уже собраны по ходу разметки
+            task["facets"] = partial.facets
+            index = partial.index
+        else:
+            task["facets"] = FacetIndex.build(df)
+        if index is None or index.total != len(df):
+            index = self.new_index()
+            index.extend(df["text"])
+        index.compact()
+        task["index"] = index
+        task["memory_bytes"] = task["index"].nbytes() + task["facets"].nbytes()
+
+    def _store_result(self, task: Dict[str, Any], df: pd.DataFrame):
+        self._build_lookups(task, df)
+        self.results.put(task["task_id"], df)
+
+    async def _complete(self, task: Dict[str, Any], df: pd.DataFrame):
+        store = profiled(task.get("profiler"), "store", self._store_result)
+        stored = asyncio.ensure_future(asyncio.to_thread(store, task, df))
+        try:
+            await asyncio.shield(stored)
+        except asyncio.CancelledError:
+            # Запись в потоке не прерывается: результат отменённой задачи
+            # удаляется, когда она закончится
+            await asyncio.gather(stored, return_exceptions=True)
+            await asyncio.to_thread(self.results.discard, task["task_id"])
+            raise
+        task["status"] = "completed"
+        task.pop("partial", None)
+        self.events.notify(task["task_id"])
+
+    def _remember_loop(self):
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+
+    def _forget(self, task_id: str):
+        """Колбэк вытеснения ResultStore.
+
+        put/get хранилища работают и в потоках to_thread, а задачи и
+        TaskEvents принадлежат event loop, поэтому из чужого потока
+        удаление переносится в loop.
+        """
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or loop.is_closed() or running is loop:
+            self._drop_task(task_id)
+        else:
+            loop.call_soon_threadsafe(self._drop_task, task_id)
+
+    def _drop_task(self, task_id: str):
+        self.tasks.pop(task_id, None)
+        self.events.forget(task_id)
+
+    def _expire_later(self, task_id: str):
+        """Неудачные и отменённые задачи живут столько же, сколько результаты"""
+        asyncio.get_running_loop().call_later(
+            self.results.ttl_seconds, self._drop_task, task_id
+        )
+
+    def get_result(self, task_id: str) -> Optional[pd.DataFrame]:
+        return self.results.get(task_id)
+
+    async def load_result(self, task_id: str) -> Optional[pd.DataFrame]:
+        """get_result вне event loop: открытие файла может вытеснить другой
+        результат и перезаписать его на диске"""
+        return await asyncio.to_thread(self.results.get, task_id)
+
+    def correct_label(
+        self, task: Dict[str, Any], df: pd.DataFrame, row: int, new_label: int
+    ):
+        old_label = int(df["label"].iat[row])
+        df.loc[df.index[row], "label"] = new_label
+        df.loc[df.index[row], "manually_corrected"] = True
+        self.results.mark_dirty(task["task_id"])
+        facets = task.get("facets")
+        if facets is not None:
+            facets.relabel(row, old_label, new_label)
+
+    async def _read_csv_chunks(self, path: str, task: Dict[str, Any]):
+        task["bytes_total"] = os.path.getsize(path)
+        rows = 0
+        read = profiled(task.get("profiler"), "csv_parse", next)
+        with open(path, "rb") as f:
+            reader = pd.read_csv(f, chunksize=get_settings().csv_chunk_rows)
+            while True:
+                chunk = await asyncio.to_thread(read, reader, None)
+                if chunk is None:
+                    break
+                rows += len(chunk)
+                task["bytes_read"] = f.tell()
+                task["total"] = max(
+                    rows, rows * task["bytes_total"] // max(task["bytes_read"], 1)
                 )
-            },
-            "recall": {
-                i: float(r)
-                for i, r in enumerate(
-                    recall_score(y_true, y_pred, average=None, zero_division=0)
+                yield chunk
+
+    def submit_csv(self, path: str, task_id: str, priority: int = 1) -> asyncio.Task:
+        """Ставит разметку загруженного CSV в очередь планировщика"""
+        job = self.scheduler.submit(
+            task_id, lambda: self.analyze_csv(path, task_id), priority
+        )
+        # Отменённая в очереди задача не доходит до analyze_csv и его finally
+        job.add_done_callback(lambda _: os.path.exists(path) and os.remove(path))
+        return job
+
+    def cancel_task(self, task_id: str) -> bool:
+        task = self.get_task_status(task_id)
+        if task is None or task["status"] != "processing":
+            return False
+        self.scheduler.cancel(task_id)
+        task["status"] = "cancelled"
+        task.pop("partial", None)
+        if self.store is not None:
+            self.store.cancel(task_id)
+        self._expire_later(task_id)
+        self.events.notify(task_id)
+        self.events.notify_all()
+        return True
+
+    async def analyze_csv(self, path: str, task_id: str) -> Optional[pd.DataFrame]:
+        """Читает загруженный CSV чанками и размечает каждый чанк сразу после разбора"""
+        task = self.tasks.get(task_id) or self.create_task(task_id)
+        started = time.perf_counter()
+        # Задача вышла из очереди: позиции остальных сдвинулись
+        self.events.notify_all()
+        try:
+            if self.store is not None:
+                await self._enqueue_csv(path, task_id, task)
+                return None
+            partial = await self._label_frames(
+                self._read_csv_chunks(path, task), task
+            )
+            df = partial.frame()
+            task["total"] = len(df)
+            task["bytes_read"] = task["bytes_total"]
+            await self._complete(task, df)
+        except asyncio.CancelledError:
+            task["status"] = "cancelled"
+            task.pop("partial", None)
+            raise
+        except Exception as e:
+            task["status"] = "failed"
+            task.pop("partial", None)
+            task["error"] = str(e)
+            if self.store is not None:
+                self.store.fail(task_id, str(e))
+            self._expire_later(task_id)
+            self.events.notify(task_id)
+            return None
+        finally:
+            os.remove(path)
+
+        if "profiler" in task:
+            task["profiler"].record("job", time.perf_counter() - started)
+        return df
+
+    async def _enqueue_csv(self, path: str, task_id: str, task: Dict[str, Any]):
+        """Раскладывает чанки в Redis и ставит их в очередь Celery-воркерам"""
+        from ..worker import score_chunk
+
+        index = 0
+        rows = 0
+        async for chunk in self._read_csv_chunks(path, task):
+            await asyncio.to_thread(self.store.push_chunk, task_id, index, chunk)
+            score_chunk.delay(task_id, index)
+            self.store.update(task_id, total=task["total"])
+            index += 1
+            rows += len(chunk)
+        self.store.mark_submitted(task_id, index, rows)
+
+    def _sync_remote(self, task_id: str) -> Optional[Dict[str, Any]]:
+        remote = self.store.get(task_id)
+        if remote is None:
+            return self.tasks.get(task_id)
+
+        task = self.tasks.setdefault(task_id, {"task_id": task_id})
+        status = remote["status"]
+        if status in ("failed", "cancelled") and task.get("status") != status:
+            self._expire_later(task_id)
+        if status == "completed":
+            # Сборка результата из чанков и индексы — долгая работа: идёт в
+            # потоке, одна на задачу, а до её конца задача остаётся processing
+            status = "processing"
+            if "loading" not in task:
+                task["loading"] = asyncio.get_running_loop().create_task(
+                    self._load_remote(task, remote["chunks"])
                 )
-            },
-            "confusion_matrix": confusion_matrix(y_true, y_pred).tolist(),
-        }
+        task.update(status=status, progress=remote["progress"], total=remote["total"])
+        if status == "failed":
+            task["error"] = remote.get("error")
+        return task
+
+    async def _load_remote(self, task: Dict[str, Any], chunks: int):
+        task_id = task["task_id"]
+        try:
+            df = await asyncio.to_thread(self.store.load_result, task_id, chunks)
+            await asyncio.to_thread(self._store_result, task, df)
+        except Exception as e:
+            task["status"] = "failed"
+            task["error"] = str(e)
+            self._expire_later(task_id)
+        else:
+            task["status"] = "completed"
+        finally:
+            task.pop("loading", None)
+            self.events.notify(task_id)
+
+    async def _predict_batch(self, texts: List[str]) -> List[Tuple[int, float]]:
+        return await self.executor.run(self.predict_cached, texts)
+
+    async def predict_texts(self, texts: List[str]) -> List[Tuple[int, float]]:
+        return await self.micro_batcher.submit(texts)
+
+    def validate(self, y_true, y_pred, bootstrap: int = 0) -> Dict[str, Any]:
+        return validate_chunks([(y_true, y_pred)], bootstrap)
+
+    def validate_csv(
+        self,
+        path: str,
+        bootstrap: int = 0,
+        task_id: Optional[str] = None,
+        id_column: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Метрики по CSV, прочитанному чанками.
+
+        Без task_id файл содержит label и true_label. С task_id предсказания
+        берутся из результата задачи, а строки файла сопоставляются по
+        text_id (номеру строки) или по колонке id_column.
+        """
+        chunk_rows = get_settings().csv_chunk_rows
+        if task_id is None:
+            reader = pd.read_csv(
+                path, usecols=["label", "true_label"], chunksize=chunk_rows
+            )
+            return validate_chunks(
+                ((chunk["true_label"], chunk["label"]) for chunk in reader), bootstrap
+            )
+
+        result = self.get_result(task_id)
+        key = id_column or "text_id"
+        reader = pd.read_csv(path, usecols=[key, "true_label"], chunksize=chunk_rows)
+        unmatched = 0
+
+        def pairs():
+            nonlocal unmatched
+            for chunk in reader:
+                predicted, found = task_predictions(result, chunk[key], id_column)
+                unmatched += int((~found).sum())
+                yield chunk["true_label"], predicted
+
+        metrics = validate_chunks(pairs(), bootstrap)
+        metrics["task_id"] = task_id
+        metrics["unmatched"] = unmatched
+        return metrics
+
+    def shutdown(self):
+        self.micro_batcher.stop()
+        self.executor.shutdown()
+        if self.shards is not None:
+            self.shards.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+        self.results.flush()
 
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
-        return self.tasks.get(task_id)
+        self._remember_loop()
+        task = self.tasks.get(task_id)
+        if self.store is not None and (task is None or task["status"] == "processing"):
+            task = self._sync_remote(task_id)
+        if task is not None and task["status"] == "processing":
+            task["queue_position"] = self.scheduler.position(task_id)
+        return task
 
 
 ml_service = MLService()
+REGISTRY.register(ServiceCollector(ml_service))
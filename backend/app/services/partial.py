@@ -0,0 +1,110 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .facets import FacetIndex
+from .text_index import InvertedIndex
+
+
+def first_rows(codes: np.ndarray) -> np.ndarray:
+    """Номер строки первого вхождения каждого текста из pd.factorize.
+
+    factorize нумерует тексты в порядке появления, поэтому когда размечены
+    тексты 0..k-1, все строки до first_rows(codes)[k] готовы целиком.
+    """
+    if not len(codes):
+        return np.empty(0, dtype=np.int64)
+    seen = np.maximum.accumulate(codes)
+    return np.flatnonzero(np.r_[True, seen[1:] > seen[:-1]])
+
+
+class LabelBlock:
+    """CSV-чанк в разметке: уникальные тексты и их метки по мере готовности.
+
+    Тексты размечаются чанками по chunk_size в любом порядке; take_ready()
+    отдаёт очередной префикс строк, все тексты которого уже размечены.
+    """
+
+    def __init__(self, df: pd.DataFrame, chunk_size: int):
+        self.df = df
+        texts = df["text"].fillna("").astype(str)
+        self.codes, self.uniques = pd.factorize(texts)
+        self.chunk_size = chunk_size
+        self.labels = np.empty(len(self.uniques), dtype=np.int64)
+        self.confidences = np.empty(len(self.uniques), dtype=np.float64)
+        self.first = first_rows(self.codes)
+        self.finished = np.zeros(-(-len(self.uniques) // chunk_size), dtype=bool)
+        self.published = 0
+        self.scored = 0
+        self.credited = 0
+
+    def starts(self) -> range:
+        return range(0, len(self.uniques), self.chunk_size)
+
+    def texts(self, start: int) -> List[str]:
+        return self.uniques[start : start + self.chunk_size].tolist()
+
+    def fill(self, start: int, results: Sequence[Tuple[int, float]]) -> int:
+        """Записывает метки чанка; возвращает прирост прогресса в строках"""
+        end = start + len(results)
+        self.labels[start:end] = [r[0] for r in results]
+        self.confidences[start:end] = [r[1] for r in results]
+        self.finished[start // self.chunk_size] = True
+        self.scored += len(results)
+        credited = len(self.df) * self.scored // len(self.uniques)
+        delta, self.credited = credited - self.credited, credited
+        return delta
+
+    @property
+    def done(self) -> bool:
+        return self.published == len(self.df)
+
+    def take_ready(self) -> Optional[pd.DataFrame]:
+        finished = self.finished
+        ready = len(finished) if finished.all() else int(finished.argmin())
+        scored = ready * self.chunk_size
+        end = len(self.df) if scored >= len(self.uniques) else int(self.first[scored])
+        if end <= self.published:
+            return None
+        rows = self.codes[self.published : end]
+        ready_rows = self.df.iloc[self.published : end].assign(
+            label=self.labels[rows], confidence=self.confidences[rows]
+        )
+        self.published = end
+        return ready_rows
+
+
+class PartialResult:
+    """Уже размеченные строки выполняющейся задачи.
+
+    Пополняется после каждого чанка инференса; фасеты и счётчики меток
+    растут вместе с ним и при завершении задачи становятся итоговыми.
+    Текстовый индекс пополняется отдельно, по мере чтения CSV-чанков, и
+    может опережать размеченные строки.
+    """
+
+    def __init__(self, index: Optional[InvertedIndex] = None):
+        self.facets = FacetIndex()
+        self.index = index
+        self._frames: List[pd.DataFrame] = []
+        self._merged = True
+
+    def __len__(self) -> int:
+        return self.facets.total
+
+    def append(self, df: pd.DataFrame):
+        if not len(df):
+            return
+        self.facets.extend(df)
+        self._frames.append(df)
+        self._merged = False
+
+    def frame(self) -> pd.DataFrame:
+        """Все размеченные строки одной таблицей; склейка живёт до append"""
+        if not self._frames:
+            return pd.DataFrame(columns=["text", "label", "confidence"])
+        if not self._merged:
+            self._frames = [pd.concat(self._frames, ignore_index=True)]
+            self._merged = True
+        return self._frames[0]
@@ -0,0 +1,189 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+PROFILE_MODES = ("cprofile", "torch", "all")
+MAX_TORCH_TRACES = 5
+# torch.profiler глобален для процесса: одновременно пишется один трейс
+TORCH_STAGES = {"inference"}
+_torch_busy = threading.Lock()
+_END = object()
+
+
+class JobProfiler:
+    """Профиль одной задачи разметки по запросу пользователя.
+
+    cProfile и torch.profiler видят только свой поток, а задача исполняется
+    кусками в разных потоках: разбор CSV, пул инференса, сохранение и отдача
+    результата. Поэтому каждый такой вызов профилируется отдельно через
+    capture(), а статистика сливается в одну. Время этапов — по стене.
+    """
+
+    def __init__(self, mode: str):
+        if mode not in PROFILE_MODES:
+            raise ValueError(
+                f"Unknown profile mode '{mode}', expected {PROFILE_MODES}"
+            )
+        self.mode = mode
+        self.use_cprofile = mode in ("cprofile", "all")
+        self.use_torch = mode in ("torch", "all")
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._stats = pstats.Stats()
+        self._torch_ops: Dict[str, List[float]] = {}
+        self._torch_traces: List[bytes] = []
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+
+    @contextmanager
+    def capture(self, stage: str):
+        """Профилирует синхронный код блока в текущем потоке"""
+        profile = cProfile.Profile() if self.use_cprofile else None
+        torch_profile = None
+        if (
+            self.use_torch
+            and stage in TORCH_STAGES
+            and _torch_busy.acquire(blocking=False)
+        ):
+            from torch.profiler import ProfilerActivity, profile as make_profile
+
+            torch_profile = make_profile(activities=[ProfilerActivity.CPU])
+            try:
+                torch_profile.__enter__()
+            except BaseException:
+                _torch_busy.release()
+                raise
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            self.record(stage, time.perf_counter() - start)
+            if torch_profile is not None:
+                torch_profile.__exit__(None, None, None)
+                _torch_busy.release()
+                self._add_torch(torch_profile)
+            if profile is not None:
+                with self._lock:
+                    self._stats.add(profile)
+
+    def wrap(self, stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            with self.capture(stage):
+                return fn(*args, **kwargs)
+
+        return profiled
+
+    def wrap_iter(self, stage: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Профилирует получение каждого элемента потоковой выдачи"""
+        iterator = iter(items)
+        while True:
+            with self.capture(stage):
+                item = next(iterator, _END)
+            if item is _END:
+                return
+            yield item
+
+    def _add_torch(self, torch_profile: Any):
+        events = torch_profile.key_averages()
+        trace = None
+        if len(self._torch_traces) < MAX_TORCH_TRACES:
+            fd, path = tempfile.mkstemp(suffix=".json")
+            os.close(fd)
+            try:
+                torch_profile.export_chrome_trace(path)
+                with open(path, "rb") as f:
+                    trace = f.read()
+            finally:
+                os.remove(path)
+        with self._lock:
+            for event in events:
+                op = self._torch_ops.setdefault(event.key, [0, 0.0, 0.0])
+                op[0] += event.count
+                op[1] += event.cpu_time_total / 1e6
+                op[2] += event.self_cpu_time_total / 1e6
+            if trace is not None and len(self._torch_traces) < MAX_TORCH_TRACES:
+                self._torch_traces.append(trace)
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = {
+                "mode": self.mode,
+                "stages": {
+                    name: {"calls": int(e["calls"]), "seconds": round(e["seconds"], 6)}
+                    for name, e in self.stages.items()
+                },
+            }
+            if self.use_cprofile:
+                result["cprofile"] = self._top_functions(top)
+            if self.use_torch:
+                ops = sorted(self._torch_ops.items(), key=lambda kv: -kv[1][2])
+                result["torch"] = [
+                    {
+                        "op": name,
+                        "calls": int(calls),
+                        "cpu_seconds": round(total, 6),
+                        "self_cpu_seconds": round(self_total, 6),
+                    }
+                    for name, (calls, total, self_total) in ops[:top]
+                ]
+        return result
+
+    def _top_functions(self, top: int) -> List[Dict[str, Any]]:
+        stats = self._stats
+        if not stats.stats:
+            return []
+        stats.sort_stats("cumulative")
+        rows = []
+        for func in stats.fcn_list[:top]:
+            _, calls, total, cumulative, _ = stats.stats[func]
+            rows.append(
+                {
+                    "function": pstats.func_std_string(func),
+                    "calls": calls,
+                    "total_seconds": round(total, 6),
+                    "cumulative_seconds": round(cumulative, 6),
+                }
+            )
+        return rows
+
+    def artifact(self, top: int = 50) -> bytes:
+        """Zip: summary.json, cprofile.prof для pstats/snakeviz и трейсы
+        torch в формате chrome://tracing"""
+        summary = self.summary(top)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(
+                "summary.json", json.dumps(summary, ensure_ascii=False, indent=2)
+            )
+            with self._lock:
+                if self.use_cprofile:
+                    # Тот же формат, что пишет pstats.Stats.dump_stats
+                    stats = marshal.dumps(self._stats.stats)
+                    archive.writestr("cprofile.prof", stats)
+                for i, trace in enumerate(self._torch_traces):
+                    archive.writestr(f"torch_trace_{i}.json", trace)
+        return buffer.getvalue()
+
+
+def profiled(
+    profiler: Optional[JobProfiler], stage: str, fn: Callable[..., Any]
+) -> Callable[..., Any]:
+    """fn без изменений, если профилирование задачи не запрошено"""
+    return fn if profiler is None else profiler.wrap(stage, fn)
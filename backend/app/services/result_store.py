@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+
+@dataclass
+class _Entry:
+    path: str
+    size: int
+    created: float
+    accessed: float
+    dirty: bool = False
+
+
+class ResultStore:
+    """Готовые результаты задач в файлах Arrow IPC на диске.
+
+    Чтение идёт через memory map: колонки DataFrame с ArrowDtype ссылаются
+    прямо на страницы файла, поэтому в RSS попадает только то, к чему
+    обращались. Задачи старше ttl_seconds и самые давно читанные сверх
+    max_disk_bytes удаляются вместе с записью задачи через on_evict.
+    Файлы, оставшиеся в каталоге от прошлого запуска, подхватываются при
+    старте и учитываются в бюджете наравне с новыми.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: int = 24 * 3600,
+        max_disk_bytes: int = 10 * 1024**3,
+        max_open: int = 16,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.max_open = max_open
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._open: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._adopt()
+        self.sweep()
+
+    def _adopt(self):
+        """Заводит записи для файлов прошлого запуска по их mtime и размеру"""
+        found = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.is_file() and item.name.endswith(".arrow"):
+                    stat = item.stat()
+                    found.append((stat.st_mtime, item.name[:-6], item.path, stat))
+        for mtime, task_id, path, stat in sorted(found):
+            self._entries[task_id] = _Entry(path, stat.st_size, mtime, mtime)
+
+    def _write(self, path: str, df: pd.DataFrame) -> int:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def put(self, task_id: str, df: pd.DataFrame):
+        path = os.path.join(self.directory, f"{task_id}.arrow")
+        size = self._write(path, df)
+        now = time.time()
+        with self._lock:
+            self._entries[task_id] = _Entry(path, size, now, now)
+            self._open.pop(task_id, None)
+        self.sweep(keep=task_id)
+
+    def get(self, task_id: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if entry is None:
+                return None
+            if time.time() - entry.created > self.ttl_seconds:
+                self._evict(task_id)
+                return None
+            entry.accessed = time.time()
+            self._entries.move_to_end(task_id)
+
+            df = self._open.get(task_id)
+            if df is None:
+                table = ipc.open_file(pa.memory_map(entry.path)).read_all()
+                df = table.to_pandas(types_mapper=pd.ArrowDtype)
+                self._open[task_id] = df
+                while len(self._open) > self.max_open:
+                    self._close(next(iter(self._open)))
+            self._open.move_to_end(task_id)
+            return df
+
+    def mark_dirty(self, task_id: str):
+        """Результат изменён на месте (ручная корректировка) и будет перезаписан"""
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if entry is not None:
+                entry.dirty = True
+
+    def _close(self, task_id: str):
+        df = self._open.pop(task_id, None)
+        entry = self._entries.get(task_id)
+        if df is not None and entry is not None and entry.dirty:
+            entry.size = self._write(entry.path, df)
+            entry.dirty = False
+
+    def discard(self, task_id: str):
+        """Удаляет результат без колбэка вытеснения: запись задачи остаётся"""
+        with self._lock:
+            self._open.pop(task_id, None)
+            entry = self._entries.pop(task_id, None)
+        if entry is not None and os.path.exists(entry.path):
+            os.remove(entry.path)
+
+    def _evict(self, task_id: str):
+        self._open.pop(task_id, None)
+        entry = self._entries.pop(task_id, None)
+        if entry is not None and os.path.exists(entry.path):
+            os.remove(entry.path)
+        if self.on_evict is not None:
+            self.on_evict(task_id)
+
+    def sweep(self, keep: Optional[str] = None):
+        """Удаляет просроченные и давно читанные сверх бюджета результаты.
+
+        keep — только что записанный результат: он не вытесняется, даже если
+        один превышает max_disk_bytes, иначе задача пропала бы сразу
+        после завершения.
+        """
+        with self._lock:
+            now = time.time()
+            for task_id, entry in list(self._entries.items()):
+                if now - entry.created > self.ttl_seconds:
+                    self._evict(task_id)
+            candidates = [task_id for task_id in self._entries if task_id != keep]
+            for task_id in candidates:
+                if self.disk_usage() <= self.max_disk_bytes:
+                    break
+                self._evict(task_id)
+
+    def disk_usage(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "tasks": len(self._entries),
+                "open": len(self._open),
+                "disk_bytes": self.disk_usage(),
+            }
+
+    def flush(self):
+        with self._lock:
+            for task_id in list(self._open):
+                self._close(task_id)
@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+@dataclass
+class _Job:
+    job_id: str
+    priority: int
+    seq: int
+    task: Optional[asyncio.Task] = None
+    admitted: Optional[asyncio.Future] = None
+    finish: float = 0.0
+    waiters: Deque[Tuple[asyncio.Future, float]] = field(default_factory=deque)
+
+
+class JobScheduler:
+    """Очередь фоновых задач разметки с честным разделением инференса.
+
+    Одновременно выполняется не больше max_running задач, остальные ждут в
+    очереди по priority (больше — раньше), затем по времени постановки.
+    Чанки запущенных задач получают слоты инференса через turn() по схеме
+    weighted fair queuing: задача с весом priority получает долю пропорционально
+    весу, поэтому небольшой файл не ждёт, пока досчитается миллион строк.
+    """
+
+    def __init__(self, max_running: int = 2, slots: int = 1):
+        self.max_running = max_running
+        self.slots = slots
+        self._jobs: Dict[str, _Job] = {}
+        self._queued: List[_Job] = []
+        self._running: Dict[str, _Job] = {}
+        self._active = 0
+        self._virtual = 0.0
+        self._seq = itertools.count()
+
+    def submit(
+        self,
+        job_id: str,
+        factory: Callable[[], Awaitable[Any]],
+        priority: int = 1,
+    ) -> asyncio.Task:
+        job = _Job(job_id, max(priority, 1), next(self._seq))
+        self._jobs[job_id] = job
+        if len(self._running) >= self.max_running:
+            job.admitted = asyncio.get_running_loop().create_future()
+            self._queued.append(job)
+        else:
+            self._start(job)
+        job.task = asyncio.create_task(self._run(job, factory))
+        return job.task
+
+    async def _run(self, job: _Job, factory: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            if job.admitted is not None:
+                await job.admitted
+            return await factory()
+        finally:
+            if job in self._queued:
+                self._queued.remove(job)
+            self._running.pop(job.job_id, None)
+            self._jobs.pop(job.job_id, None)
+            self._admit()
+
+    def _start(self, job: _Job):
+        job.finish = self._virtual
+        self._running[job.job_id] = job
+
+    def _admit(self):
+        while self._queued and len(self._running) < self.max_running:
+            job = min(self._queued, key=lambda j: (-j.priority, j.seq))
+            self._queued.remove(job)
+            self._start(job)
+            job.admitted.set_result(None)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """0 — задача выполняется, N — место в очереди, None — задачи нет"""
+        if job_id in self._running:
+            return 0
+        order = sorted(self._queued, key=lambda j: (-j.priority, j.seq))
+        for position, job in enumerate(order, start=1):
+            if job.job_id == job_id:
+                return position
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.task is None or job.task.done():
+            return False
+        job.task.cancel()
+        return True
+
+    def _charge(self, job: _Job, cost: float):
+        start = max(job.finish, self._virtual)
+        job.finish = start + cost / job.priority
+        self._virtual = start
+        self._active += 1
+
+    def _dispatch(self):
+        while self._active < self.slots:
+            ready = [job for job in self._running.values() if job.waiters]
+            if not ready:
+                return
+            job = min(ready, key=lambda j: max(j.finish, self._virtual))
+            future, cost = job.waiters.popleft()
+            if future.cancelled():
+                # Ожидавший чанк отменён вместе с задачей
+                continue
+            self._charge(job, cost)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def turn(self, job_id: str, cost: float):
+        """Слот инференса для очередного чанка задачи job_id весом cost строк"""
+        job = self._running.get(job_id)
+        if job is None:
+            # Задача запущена в обход планировщика
+            yield
+            return
+
+        if self._active < self.slots and not any(
+            j.waiters for j in self._running.values()
+        ):
+            self._charge(job, cost)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            job.waiters.append((future, cost))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._active -= 1
+                    self._dispatch()
+                elif (future, cost) in job.waiters:
+                    job.waiters.remove((future, cost))
+                raise
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": len(self._running),
+            "queued": len(self._queued),
+            "active_batches": self._active,
+        }
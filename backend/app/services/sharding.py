@@ -0,0 +1,52 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+_classifier = None
+
+
+def _init_shard(classifier_kwargs: Dict[str, Any]):
+    global _classifier
+    from ..models.classifier import SentimentClassifier
+
+    _classifier = SentimentClassifier(**classifier_kwargs)
+
+
+def _predict_shard(texts: List[str], batch_size: int) -> List[Tuple[int, float]]:
+    return _classifier.predict(texts, batch_size)
+
+
+class ShardPool:
+    """Пул процессов, у каждого своя копия классификатора.
+
+    Процессы стартуют через spawn: fork после инициализации пулов потоков
+    torch может зависнуть. Веса читаются из safetensors через mmap, поэтому
+    страницы файла делятся между процессами через page cache.
+    """
+
+    def __init__(self, shards: int, threads: int, classifier_kwargs: Dict[str, Any]):
+        self.shards = shards
+        self.threads = threads or max(1, (os.cpu_count() or 1) // shards)
+        kwargs = dict(classifier_kwargs, num_threads=self.threads)
+        self._pool = ProcessPoolExecutor(
+            max_workers=shards,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_shard,
+            initargs=(kwargs,),
+        )
+
+    def predict(self, texts: List[str], batch_size: int) -> List[Tuple[int, float]]:
+        return self._pool.submit(_predict_shard, texts, batch_size).result()
+
+    def warmup(self, texts: List[str], batch_size: int):
+        """Поднимает все процессы-шарды и прогоняет через каждый пробный батч"""
+        futures = [
+            self._pool.submit(_predict_shard, texts, batch_size)
+            for _ in range(self.shards)
+        ]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,131 @@
+import io
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+INT_FIELDS = ("progress", "total", "chunks", "chunks_done")
+
+
+def redis_from_url(url: str):
+    if url.startswith("fakeredis://"):
+        import fakeredis
+
+        return fakeredis.FakeRedis()
+
+    import redis
+
+    return redis.Redis.from_url(url)
+
+
+class RedisTaskStore:
+    """Общее хранилище задач и чанков в Redis для распределённого режима.
+
+    Метаданные задачи лежат в хэше, входные чанки и предсказания воркеров —
+    в отдельных ключах. Задача становится completed, когда число готовых
+    чанков сравнялось с числом отправленных (chunks = -1, пока API ещё
+    дочитывает файл).
+    """
+
+    def __init__(self, client, ttl: int = 24 * 3600, prefix: str = "sentiment"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: int = 24 * 3600) -> "RedisTaskStore":
+        return cls(redis_from_url(url), ttl)
+
+    def _key(self, task_id: str, *parts: Any) -> str:
+        return ":".join([self.prefix, "task", task_id, *map(str, parts)])
+
+    def create(self, task_id: str, **fields: Any):
+        meta = {"status": "processing", "progress": 0, "total": 0, "chunks": -1}
+        meta.update(fields)
+        meta["chunks_done"] = 0
+        key = self._key(task_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={k: str(v) for k, v in meta.items()})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def update(self, task_id: str, **fields: Any):
+        mapping = {k: str(v) for k, v in fields.items()}
+        self.client.hset(self._key(task_id), mapping=mapping)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.hgetall(self._key(task_id))
+        if not raw:
+            return None
+        meta = {k.decode(): v.decode() for k, v in raw.items()}
+        for field in INT_FIELDS:
+            if field in meta:
+                meta[field] = int(meta[field])
+        return meta
+
+    def push_chunk(self, task_id: str, index: int, df: pd.DataFrame):
+        self.client.set(
+            self._key(task_id, "input", index),
+            df.to_json(orient="split", index=False, force_ascii=False),
+            ex=self.ttl,
+        )
+
+    def load_chunk(self, task_id: str, index: int) -> pd.DataFrame:
+        payload = self.client.get(self._key(task_id, "input", index))
+        return pd.read_json(
+            io.StringIO(payload.decode()),
+            orient="split",
+            dtype=False,
+            convert_dates=False,
+        )
+
+    def save_predictions(
+        self, task_id: str, index: int, labels: List[int], confidences: List[float]
+    ):
+        key = self._key(task_id)
+        pipe = self.client.pipeline()
+        pipe.set(
+            self._key(task_id, "output", index),
+            json.dumps({"label": labels, "confidence": confidences}),
+            ex=self.ttl,
+        )
+        pipe.hincrby(key, "progress", len(labels))
+        pipe.hincrby(key, "chunks_done", 1)
+        pipe.hget(key, "chunks")
+        _, _, done, chunks = pipe.execute()
+        self._complete_if_done(task_id, done, int(chunks))
+
+    def mark_submitted(self, task_id: str, chunks: int, total: int):
+        key = self._key(task_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={"chunks": chunks, "total": total})
+        pipe.hget(key, "chunks_done")
+        _, done = pipe.execute()
+        self._complete_if_done(task_id, int(done), chunks)
+
+    def _complete_if_done(self, task_id: str, done: int, chunks: int):
+        if chunks >= 0 and done >= chunks and not self.is_cancelled(task_id):
+            self.update(task_id, status="completed")
+
+    def fail(self, task_id: str, error: str):
+        self.update(task_id, status="failed", error=error)
+
+    def cancel(self, task_id: str):
+        self.update(task_id, status="cancelled")
+
+    def is_cancelled(self, task_id: str) -> bool:
+        status = self.client.hget(self._key(task_id), "status")
+        return status == b"cancelled"
+
+    def load_result(self, task_id: str, chunks: int) -> pd.DataFrame:
+        frames = []
+        for index in range(chunks):
+            df = self.load_chunk(task_id, index)
+            output = json.loads(self.client.get(self._key(task_id, "output", index)))
+            df["label"] = np.asarray(output["label"], dtype=np.int64)
+            df["confidence"] = np.asarray(output["confidence"], dtype=np.float64)
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=["text", "label", "confidence"])
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,144 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Строк в одном прогоне токенизации: ограничивает пиковую память построения
+CHUNK_ROWS = 10_000
+
+
+class InvertedIndex:
+    """Инвертированный индекс по токенам текстов задачи.
+
+    Токены получаются через TextPreprocessor.clean_text. Если передан
+    lemmatize, ключом служит лемма токена, так что «доставка» находит
+    и «доставкой».
+
+    Пополняется чанками по ходу разметки через extend(): каждый чанк
+    становится отдельным отсортированным прогоном пар (ключ, строка), а
+    compact() после завершения задачи склеивает их в постинги со
+    смещениями по ключам.
+    """
+
+    def __init__(
+        self,
+        normalize: Callable[[str], str],
+        lemmatize: Optional[Callable[[str], str]] = None,
+    ):
+        self.normalize = normalize
+        self.lemmatize = lemmatize
+        self.total = 0
+        self.keys: Dict[str, int] = {}
+        self._key_of: Dict[str, int] = {}
+        self._runs: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.empty(0, dtype=np.int64)
+        self._writing = threading.Lock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(
+        cls,
+        texts: pd.Series,
+        normalize: Callable[[str], str],
+        lemmatize: Optional[Callable[[str], str]] = None,
+    ) -> "InvertedIndex":
+        index = cls(normalize, lemmatize)
+        index.extend(texts)
+        index.compact()
+        return index
+
+    def _key(self, token: str) -> int:
+        key = self.lemmatize(token) if self.lemmatize is not None else token
+        key_id = self.keys.setdefault(key, len(self.keys))
+        self._key_of[token] = key_id
+        return key_id
+
+    def _run(self, texts: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        key_of = self._key_of
+        ids: List[int] = []
+        counts = np.empty(len(texts), dtype=np.int64)
+        for i, text in enumerate(texts.map(self.normalize)):
+            # Повторы токена и токены с общей леммой схлопываются внутри
+            # строки, не доходя до массивов
+            tokens = set(text.split())
+            row = set(map(key_of.get, tokens))
+            if None in row:
+                row = {self._key(t) if t not in key_of else key_of[t] for t in tokens}
+            ids.extend(row)
+            counts[i] = len(row)
+        keys = np.array(ids, dtype=np.int32)
+        rows = np.repeat(np.arange(self.total, self.total + len(texts)), counts)
+        order = np.argsort(keys, kind="stable")
+        return keys[order], rows[order]
+
+    def extend(self, texts: pd.Series):
+        """Дописывает строки следующего чанка; вызовы должны идти по порядку"""
+        with self._writing:
+            for start in range(0, len(texts), CHUNK_ROWS):
+                part = texts.iloc[start : start + CHUNK_ROWS]
+                run = self._run(part)
+                with self._lock:
+                    self._runs.append(run)
+                    self.total += len(part)
+
+    def compact(self):
+        """Склеивает прогоны в постинги, чтобы поиск не обходил их по очереди"""
+        with self._lock:
+            runs = list(self._runs)
+            offsets, postings = self._offsets, self._postings
+        if not runs:
+            return
+        merged = np.arange(len(offsets) - 1, dtype=np.int32)
+        keys = np.repeat(merged, np.diff(offsets))
+        keys = np.concatenate([keys, *(run_keys for run_keys, _ in runs)])
+        rows = np.concatenate([postings, *(rows for _, rows in runs)])
+        # Прогоны идут по возрастанию строк, поэтому устойчивая сортировка
+        # по ключу оставляет строки каждого ключа упорядоченными
+        order = np.argsort(keys, kind="stable")
+        counts = np.bincount(keys, minlength=len(self.keys))
+        with self._lock:
+            self._offsets = np.concatenate([[0], np.cumsum(counts)])
+            self._postings = rows[order]
+            del self._runs[: len(runs)]
+
+    def nbytes(self) -> int:
+        """Размер постингов; словарь токенов не учитывается"""
+        with self._lock:
+            arrays = [self._offsets, self._postings]
+            arrays += [array for run in self._runs for array in run]
+        return sum(array.nbytes for array in arrays)
+
+    def _token_rows(self, token: str) -> np.ndarray:
+        key = self.lemmatize(token) if self.lemmatize is not None else token
+        key_id = self.keys.get(key)
+        if key_id is None:
+            return np.empty(0, dtype=np.int64)
+        with self._lock:
+            runs = list(self._runs)
+            offsets, postings = self._offsets, self._postings
+        parts = []
+        if key_id < len(offsets) - 1 and offsets[key_id + 1] > offsets[key_id]:
+            parts.append(postings[offsets[key_id] : offsets[key_id + 1]])
+        for keys, rows in runs:
+            low, high = keys.searchsorted([key_id, key_id + 1])
+            if high > low:
+                parts.append(rows[low:high])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def lookup(self, query: str) -> np.ndarray:
+        """Возвращает отсортированные номера строк, содержащих все токены запроса"""
+        result: Optional[np.ndarray] = None
+        for token in self.normalize(query).split():
+            rows = self._token_rows(token)
+            if result is None:
+                result = rows
+            else:
+                # Постинги уже отсортированы и без повторов
+                result = np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result if result is not None else np.empty(0, dtype=np.int64)
@@ -0,0 +1,138 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+N_CLASSES = 3
+
+
+def _labels(values: Any) -> np.ndarray:
+    """Метки как float64: NaN только на месте действительно пропущенных.
+
+    Нечисловые, дробные и вне 0..N_CLASSES-1 значения — ошибка, а не пропуск.
+    """
+    series = pd.Series(values)
+    labels = pd.to_numeric(series, errors="coerce").to_numpy(np.float64)
+    present = series.notna().to_numpy()
+    with np.errstate(invalid="ignore"):
+        valid = (labels == np.floor(labels)) & (labels >= 0) & (labels < N_CLASSES)
+    bad = present & ~valid
+    if bad.any():
+        value = series[bad].iloc[0]
+        raise ValueError(
+            f"Labels must be integers from 0 to {N_CLASSES - 1}, got {value!r}"
+        )
+    return labels
+
+
+def confusion_update(matrix: np.ndarray, y_true: Any, y_pred: Any) -> int:
+    """Добавляет пары меток в матрицу ошибок одним bincount.
+
+    Строки с пропущенной меткой пропускаются; возвращает число учтённых строк.
+    """
+    y_true = _labels(y_true)
+    y_pred = _labels(y_pred)
+    known = ~(np.isnan(y_true) | np.isnan(y_pred))
+    y_true = y_true[known].astype(np.int64)
+    y_pred = y_pred[known].astype(np.int64)
+    counts = np.bincount(y_true * N_CLASSES + y_pred, minlength=N_CLASSES**2)
+    matrix += counts.reshape(N_CLASSES, N_CLASSES)
+    return len(y_true)
+
+
+def _scores(matrices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Precision, recall и F1 по классам для стопки матриц (..., n, n)"""
+    tp = np.diagonal(matrices, axis1=-2, axis2=-1).astype(np.float64)
+    predicted = matrices.sum(axis=-2)
+    support = matrices.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(tp > 0, 2 * tp / (predicted + support), 0.0)
+    return precision, recall, f1
+
+
+def _present(matrix: np.ndarray) -> np.ndarray:
+    # Как в sklearn: усредняются классы, встретившиеся в истинных или
+    # предсказанных метках
+    return (matrix.sum(axis=0) + matrix.sum(axis=1)) > 0
+
+
+def bootstrap_macro_f1(
+    matrix: np.ndarray,
+    resamples: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Бутстрап-интервал macro-F1.
+
+    Выборка строк с возвращением эквивалентна мультиномиальной выборке
+    ячеек матрицы ошибок, поэтому все resamples матриц строятся разом
+    без обращения к исходным строкам.
+    """
+    total = int(matrix.sum())
+    rng = np.random.default_rng(seed)
+    cells = rng.multinomial(total, matrix.ravel() / total, size=resamples)
+    _, _, f1 = _scores(cells.reshape(resamples, N_CLASSES, N_CLASSES))
+    macro = f1[:, _present(matrix)].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(macro, [alpha, 1 - alpha])
+    return {
+        "low": float(low),
+        "high": float(high),
+        "confidence": confidence,
+        "resamples": resamples,
+    }
+
+
+def metrics_from_confusion(
+    matrix: np.ndarray, bootstrap: int = 0, seed: int = 0
+) -> Dict[str, Any]:
+    precision, recall, f1 = _scores(matrix)
+    present = _present(matrix)
+    total = int(matrix.sum())
+    metrics: Dict[str, Any] = {
+        "rows": total,
+        "macro_f1": float(f1[present].mean()) if present.any() else 0.0,
+        "accuracy": float(np.trace(matrix) / total) if total else 0.0,
+        "precision": {i: float(p) for i, p in enumerate(precision)},
+        "recall": {i: float(r) for i, r in enumerate(recall)},
+        "confusion_matrix": matrix.tolist(),
+    }
+    if bootstrap > 0 and total:
+        metrics["macro_f1_ci"] = bootstrap_macro_f1(matrix, bootstrap, seed=seed)
+    return metrics
+
+
+def validate_chunks(
+    chunks: Iterable[Tuple[Any, Any]], bootstrap: int = 0
+) -> Dict[str, Any]:
+    """Метрики по потоку пар (истинные, предсказанные) без хранения строк"""
+    matrix = np.zeros((N_CLASSES, N_CLASSES), dtype=np.int64)
+    for y_true, y_pred in chunks:
+        confusion_update(matrix, y_true, y_pred)
+    return metrics_from_confusion(matrix, bootstrap)
+
+
+def task_predictions(
+    result: pd.DataFrame, ids: pd.Series, id_column: Optional[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Предсказания задачи для строк ground truth.
+
+    ids — номера строк результата (text_id, как в /correct) либо значения
+    колонки id_column результата. Возвращает метки и маску найденных строк.
+    """
+    labels = result["label"].to_numpy(dtype=np.float64, na_value=np.nan)
+    if id_column is None:
+        positions = pd.to_numeric(ids, errors="coerce").to_numpy(np.float64)
+        found = (positions >= 0) & (positions < len(result))
+        found &= positions == np.floor(positions)
+        positions = np.where(found, positions, 0).astype(np.int64)
+    else:
+        index = pd.Index(result[id_column].to_numpy())
+        if not index.is_unique:
+            raise ValueError(f"Column '{id_column}' is not unique in task results")
+        positions = index.get_indexer(ids.to_numpy())
+        found = positions >= 0
+    predicted = np.where(found, labels[positions] if len(labels) else np.nan, np.nan)
+    return predicted, found
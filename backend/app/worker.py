@@ -0,0 +1,43 @@
+from celery import Celery
+from celery.signals import worker_process_init
+
+from .core.config import get_settings
+from .services.ml_service import ml_service
+
+settings = get_settings()
+
+celery_app = Celery(
+    "sentiment", broker=settings.celery_broker_url or settings.redis_url
+)
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    task_always_eager=settings.celery_eager,
+)
+
+
+@worker_process_init.connect
+def preload_model(**_):
+    """Модель грузится и прогревается при старте процесса, а не на первом чанке"""
+    ml_service.startup()
+
+
+@celery_app.task(name="sentiment.score_chunk")
+def score_chunk(task_id: str, index: int):
+    """Размечает один чанк задачи и сохраняет предсказания в Redis"""
+    store = ml_service.store
+    if store.is_cancelled(task_id):
+        return
+    try:
+        df = store.load_chunk(task_id, index)
+        texts = df["text"].fillna("").astype(str).tolist()
+        predictions = ml_service.predict_cached(texts)
+        store.save_predictions(
+            task_id,
+            index,
+            [int(label) for label, _ in predictions],
+            [float(confidence) for _, confidence in predictions],
+        )
+    except Exception as e:
+        store.fail(task_id, f"chunk {index}: {e}")
+        raise
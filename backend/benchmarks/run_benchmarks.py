@@ -0,0 +1,388 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "training"))
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+SUITES = ("preprocessing", "lemmatize", "classifier", "api")
+DISTRIBUTIONS = ("short", "medium", "long", "mixed")
+
+WORDS = (
+    "отличный товар доставка быстро качество хорошее плохое ужасно нормально "
+    "рекомендую купил заказ пришёл вовремя сломался через неделю магазин "
+    "продавец вежливый упаковка цена дорого дёшево брак возврат деньги "
+    "вернули телефон экран батарея держит заряд долго камера снимает "
+    "работает отлично никому не советую очень доволен разочарован "
+    "средне пойдёт за свои деньги курьер опоздал поддержка ответила "
+    "размер подошёл маломерит ткань приятная запах сильный инструкция "
+    "понятная сборка простая шумит греется great product bad quality ok"
+).split()
+NOISE = (
+    "<b>", "</b>", "<br/>", "https://example.com/item?id=42", "www.shop.ru",
+    "!!!", "???", "...", "😀", "👍", "123", "5/5", "Очень", "ОТЛИЧНО",
+)
+
+
+def make_corpus(size, distribution, seed=0):
+    """Синтетические отзывы с разметкой и ссылками, одинаковые для одного seed"""
+    rng = random.Random(f"{distribution}:{seed}")
+    texts = []
+    for _ in range(size):
+        if distribution == "short":
+            length = rng.randint(3, 12)
+        elif distribution == "medium":
+            length = rng.randint(20, 60)
+        elif distribution == "long":
+            length = rng.randint(150, 400)
+        else:
+            length = min(max(int(rng.lognormvariate(3.0, 1.0)), 1), 400)
+        words = [
+            rng.choice(NOISE) if rng.random() < 0.08 else rng.choice(WORDS)
+            for _ in range(length)
+        ]
+        texts.append(" ".join(words))
+    return texts
+
+
+def measure(fn, repeats):
+    """Один прогрев и repeats замеров; возвращает медиану и минимум в секундах"""
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times)
+
+
+def throughput(rows, median, best, **extra):
+    # Сравнивается лучший замер: он меньше всего зависит от соседей по машине
+    return {
+        "metric": "rows_per_sec",
+        "value": rows / best,
+        "rows": rows,
+        "median_s": median,
+        "min_s": best,
+        **extra,
+    }
+
+
+def bench_preprocessing(args):
+    from preprocessing import preprocess_text
+
+    results = {}
+    for distribution in ("short", "mixed", "long"):
+        texts = make_corpus(args.scale * 10, distribution)
+        median, best = measure(
+            lambda: [preprocess_text(t) for t in texts], args.repeats
+        )
+        results[f"preprocessing.text.{distribution}"] = throughput(
+            len(texts), median, best
+        )
+    return results
+
+
+def bench_lemmatize(args):
+    from app.models.preprocessing import TextPreprocessor
+
+    texts = make_corpus(args.scale, "mixed")
+    warm = TextPreprocessor()
+    warm.load()
+
+    def cold():
+        # Новый кэш на каждый замер; словари pymorphy уже в памяти
+        preprocessor = TextPreprocessor()
+        preprocessor._morph = warm.morph
+        [preprocessor.lemmatize(t) for t in texts]
+
+    results = {}
+    median, best = measure(cold, args.repeats)
+    results["lemmatize.cold"] = throughput(len(texts), median, best)
+    median, best = measure(lambda: [warm.lemmatize(t) for t in texts], args.repeats)
+    results["lemmatize.warm"] = throughput(len(texts), median, best)
+    median, best = measure(lambda: warm.lemmatize_batch(texts), args.repeats)
+    results["lemmatize.batch"] = throughput(len(texts), median, best)
+    return results
+
+
+def build_tiny_model(path):
+    """Случайно инициализированный BERT на 2 слоя со словарём из WORDS.
+
+    Качество предсказаний не важно: модель нужна, чтобы измерять накладные
+    расходы токенизации, батчинга и сервиса без скачивания весов.
+    """
+    import torch
+    from transformers import (
+        BertConfig,
+        BertForSequenceClassification,
+        BertTokenizerFast,
+    )
+
+    os.makedirs(path, exist_ok=True)
+    chars = sorted(set("".join(WORDS + list(NOISE)).lower()) - {" "})
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += sorted(set(w.lower() for w in WORDS)) + chars + [f"##{c}" for c in chars]
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(dict.fromkeys(vocab)) + "\n")
+
+    tokenizer = BertTokenizerFast(vocab_file=vocab_file, do_lower_case=True)
+    tokenizer.save_pretrained(path)
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=256,
+        max_position_embeddings=512,
+        num_labels=3,
+    )
+    BertForSequenceClassification(config).save_pretrained(path)
+    return path
+
+
+def bench_classifier(args):
+    from app.models.classifier import SentimentClassifier
+
+    classifier = SentimentClassifier(
+        args.model, max_length=256, num_threads=args.threads
+    )
+    results = {}
+    for distribution in DISTRIBUTIONS:
+        texts = make_corpus(args.scale // 4, distribution)
+        tokens = sum(
+            len(ids)
+            for ids in classifier.tokenizer(texts, truncation=True, max_length=256)[
+                "input_ids"
+            ]
+        )
+        for batch_size in (1, 8, 32, 128):
+            median, best = measure(
+                lambda: classifier.predict(texts, batch_size), args.repeats
+            )
+            results[f"classifier.{distribution}.bs{batch_size}"] = throughput(
+                len(texts), median, best, tokens_per_sec=tokens / best
+            )
+    return results
+
+
+async def _api_round_trip(client, payload):
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/analyze", files={"file": ("bench.csv", payload, "text/csv")}
+    )
+    response.raise_for_status()
+    task_id = response.json()["task_id"]
+    while True:
+        body = (await client.get(f"/api/results/{task_id}", params={"limit": 1})).json()
+        if body["status"] == "completed":
+            return time.perf_counter() - start
+        if body["status"] != "processing":
+            raise RuntimeError(f"Task {task_id} ended with {body}")
+        await asyncio.sleep(0.005)
+
+
+def bench_api(args):
+    # Настройки читаются один раз при импорте приложения
+    os.environ["MODEL_NAME"] = args.model
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["RESULTS_DIR"] = tempfile.mkdtemp(prefix="bench-results-")
+    os.environ["EXECUTION_MODE"] = "local"
+    import httpx
+    import pandas as pd
+
+    from app.main import app
+    from app.services.ml_service import ml_service
+
+    ml_service.startup()
+    results = {}
+    for rows in (100, args.scale):
+        buffer = io.StringIO()
+        pd.DataFrame({"text": make_corpus(rows, "mixed")}).to_csv(buffer, index=False)
+        payload = buffer.getvalue().encode("utf-8")
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                await _api_round_trip(client, payload)
+                return [
+                    await _api_round_trip(client, payload) for _ in range(args.repeats)
+                ]
+
+        latencies = sorted(asyncio.run(run()))
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        results[f"api.analyze_to_results.{rows}"] = {
+            "metric": "min_ms",
+            "value": latencies[0] * 1000,
+            "rows": rows,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": p95 * 1000,
+        }
+    ml_service.shutdown()
+    return results
+
+
+LOWER_IS_BETTER = {"min_ms"}
+
+
+def compare(results, baseline, threshold):
+    """Изменение относительно baseline: положительное — быстрее"""
+    report = {}
+    for name, entry in results.items():
+        base = baseline.get(name)
+        if not base or base.get("metric") != entry["metric"] or not base["value"]:
+            continue
+        ratio = entry["value"] / base["value"]
+        change = 1 / ratio - 1 if entry["metric"] in LOWER_IS_BETTER else ratio - 1
+        report[name] = {
+            "baseline": base["value"],
+            "current": entry["value"],
+            "change": change,
+            "regression": change < -threshold,
+        }
+    return report
+
+
+def differences(current, baseline):
+    """Ключи текущего отчёта, отличающиеся от baseline: «ключ: было -> стало»"""
+    return [
+        f"{key}: {baseline.get(key)!r} -> {value!r}"
+        for key, value in sorted(current.items())
+        if baseline.get(key) != value
+    ]
+
+
+def environment():
+    import numpy
+    import torch
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "numpy": numpy.__version__,
+    }
+
+
+def main(args):
+    suites = args.suites.split(",")
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Неизвестные наборы: {', '.join(sorted(unknown))}")
+
+    if args.threads > 0:
+        import torch
+
+        torch.set_num_threads(args.threads)
+
+    model_dir = None
+    if not args.model and {"classifier", "api"} & set(suites):
+        model_dir = tempfile.TemporaryDirectory(prefix="bench-model-")
+        args.model = build_tiny_model(model_dir.name)
+
+    results = {}
+    for suite in suites:
+        print(f"== {suite}")
+        suite_results = globals()[f"bench_{suite}"](args)
+        for name, entry in suite_results.items():
+            print(f"{name:<40} {entry['value']:>14,.1f} {entry['metric']}")
+        results.update(suite_results)
+
+    report = {
+        "environment": environment(),
+        "config": {"scale": args.scale, "repeats": args.repeats, "model": args.model},
+        "results": results,
+    }
+    if not {"classifier", "api"} & set(suites):
+        # Модель в замерах не участвует и не мешает сравнению
+        del report["config"]["model"]
+    if model_dir is not None:
+        report["config"]["model"] = "tiny-random-bert"
+        model_dir.cleanup()
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        changed = differences(report["config"], baseline.get("config", {}))
+        if changed:
+            # Другой размер корпуса или модель меняют сами числа, а не скорость
+            print("\nСравнение с baseline пропущено, другая конфигурация:")
+            for line in changed:
+                print(f"  {line}")
+            comparison = {}
+        else:
+            machine = baseline.get("environment", {})
+            for line in differences(report["environment"], machine):
+                print(f"Предупреждение: другое окружение, {line}")
+            comparison = compare(results, baseline["results"], args.threshold)
+            report["comparison"] = comparison
+        if comparison:
+            print(
+                f"\n{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}"
+            )
+        for name, row in comparison.items():
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(
+                f"{name:<40} {row['baseline']:>12,.1f} {row['current']:>12,.1f}"
+                f" {row['change']:>+8.1%}{flag}"
+            )
+            if row["regression"]:
+                regressions.append(name)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nРезультаты сохранены: {args.output}")
+
+    if regressions:
+        print(f"\nРегрессии больше {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Замеры предобработки, лемматизации, инференса и API"
+    )
+    parser.add_argument(
+        "--suites", type=str, default=",".join(SUITES), help="Наборы через запятую"
+    )
+    parser.add_argument(
+        "--scale", type=int, default=2000, help="Базовый размер корпуса в текстах"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="Модель для classifier и api (по умолчанию маленький случайный BERT)",
+    )
+    parser.add_argument("--threads", type=int, default=1, help="Потоков torch, 0 — все")
+    parser.add_argument("--output", "-o", type=str, default="benchmark_results.json")
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=BASELINE_PATH,
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="Допустимое замедление"
+    )
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,36 @@
+import unittest
+
+from app.models.batching import token_budget_batches
+
+
+class TestTokenBudgetBatches(unittest.TestCase):
+
+    def test_all_indices_covered_once(self):
+        lengths = [5, 120, 7, 33, 512, 9, 1]
+        batches = token_budget_batches(lengths, max_tokens=600, max_batch_size=4)
+        flat = sorted(i for batch in batches for i in batch)
+        self.assertEqual(flat, list(range(len(lengths))))
+
+    def test_padded_tokens_within_budget(self):
+        lengths = [10, 300, 12, 11, 250, 9, 8, 40]
+        batches = token_budget_batches(lengths, max_tokens=320, max_batch_size=32)
+        for batch in batches:
+            width = max(lengths[i] for i in batch)
+            self.assertLessEqual(width * len(batch), 320)
+
+    def test_long_text_alone_in_batch(self):
+        lengths = [10, 512, 10, 10]
+        batches = token_budget_batches(lengths, max_tokens=512, max_batch_size=32)
+        self.assertEqual(batches[0], [1])
+        self.assertEqual(sorted(batches[1]), [0, 2, 3])
+
+    def test_max_batch_size(self):
+        batches = token_budget_batches([3] * 10, max_tokens=10_000, max_batch_size=4)
+        self.assertEqual([len(b) for b in batches], [4, 4, 2])
+
+    def test_empty(self):
+        self.assertEqual(token_budget_batches([], max_tokens=100, max_batch_size=8), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
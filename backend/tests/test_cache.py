@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app.services.cache import PredictionCache
+
+
+class TestPredictionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_normalized_texts_share_key(self):
+        cache = PredictionCache("model", str.lower)
+        self.assertEqual(cache.key("Отлично"), cache.key("отлично"))
+        self.assertNotEqual(
+            cache.key("отлично"), PredictionCache("other", str.lower).key("отлично")
+        )
+
+    def test_lru_eviction_and_counters(self):
+        cache = PredictionCache("model", str.lower, max_items=2)
+        cache.put_many({"a": (0, 0.9), "b": (1, 0.8)})
+        cache.get_many(["a"])
+        cache.put_many({"c": (2, 0.7)})
+        found = cache.get_many(["a", "b", "c"])
+        self.assertEqual(found, {"a": (0, 0.9), "c": (2, 0.7)})
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 1))
+
+    def test_disk_tier_survives_restart(self):
+        cache = PredictionCache("model", str.lower, path=self.path)
+        cache.put_many({"a": (2, 0.5)})
+        cache.close()
+
+        reopened = PredictionCache("model", str.lower, path=self.path)
+        self.assertEqual(reopened.get_many(["a"]), {"a": (2, 0.5)})
+        self.assertEqual(reopened.stats()["disk_hits"], 1)
+        reopened.close()
+
+    def test_connection_opens_lazily_per_process(self):
+        cache = PredictionCache("model", str.lower, path=self.path)
+        self.assertFalse(os.path.exists(self.path))
+        cache.put_many({"a": (1, 0.6)})
+        parent = cache._db
+
+        # Форкнутый воркер не пользуется соединением родителя
+        with mock.patch("app.services.cache.os.getpid", return_value=-1):
+            self.assertEqual(cache.get_many(["b"]), {})
+            self.assertIsNot(cache._db, parent)
+            cache.put_many({"b": (0, 0.7)})
+            cache.close()
+        count = parent.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        self.assertEqual(count, (2,))
+        parent.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
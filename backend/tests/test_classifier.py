@@ -0,0 +1,125 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app.core.config import get_settings
+from app.models.classifier import (
+    SentimentClassifier,
+    model_fingerprint,
+    prepare_onnx,
+)
+from app.services.cache import PredictionCache
+from app.services.ml_service import ml_service
+
+BENCHMARKS = os.path.join(
+    os.path.dirname(__file__), "..", "benchmarks", "run_benchmarks.py"
+)
+TEXTS = [
+    "отличный товар, доставка быстро",
+    "ужасно, сломался через неделю",
+    "нормально",
+    "курьер опоздал, но поддержка ответила",
+    "great product " * 20,
+]
+
+
+def build_tiny_model(path: str) -> str:
+    """Случайный BERT из бенчмарков: модель без скачивания весов"""
+    spec = importlib.util.spec_from_file_location("run_benchmarks", BENCHMARKS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.build_tiny_model(path)
+
+
+class TestBackends(unittest.TestCase):
+    """Бэкенды инференса на крошечном случайном BERT из бенчмарков"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.model = build_tiny_model(os.path.join(cls.tmp.name, "model"))
+        cls.onnx_dir = os.path.join(cls.tmp.name, "onnx")
+        cls.reference = cls.predict("torch")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    @classmethod
+    def predict(cls, backend: str):
+        classifier = SentimentClassifier(
+            cls.model, max_length=64, backend=backend, onnx_dir=cls.onnx_dir
+        )
+        return classifier.predict(TEXTS)
+
+    def assertAgree(self, results, places: int):
+        self.assertEqual(len(results), len(self.reference))
+        for (label, conf), (ref_label, ref_conf) in zip(results, self.reference):
+            self.assertEqual(label, ref_label)
+            self.assertAlmostEqual(conf, ref_conf, places=places)
+
+    def test_unknown_backend_rejected(self):
+        with self.assertRaises(ValueError):
+            SentimentClassifier(self.model, backend="tensorrt")
+
+    def test_onnx_matches_torch(self):
+        self.assertAgree(self.predict("onnx"), places=4)
+
+    def test_int8_backends_close_to_torch(self):
+        for backend in ("torch_int8", "onnx_int8"):
+            with self.subTest(backend=backend):
+                self.assertAgree(self.predict(backend), places=1)
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model = build_tiny_model(os.path.join(self.tmp.name, "model"))
+        self.onnx_dir = os.path.join(self.tmp.name, "onnx")
+
+    def retrain(self):
+        """Перезаписывает веса по тому же пути, как это делает train_model"""
+        weights = os.path.join(self.model, "model.safetensors")
+        stat = os.stat(weights)
+        os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_rewritten_weights_get_new_export(self):
+        fingerprint = model_fingerprint(self.model)
+        self.assertEqual(model_fingerprint(self.model), fingerprint)
+        path = prepare_onnx(self.model, self.onnx_dir, quantize=False)
+        self.assertIn(fingerprint, path)
+
+        self.retrain()
+        self.assertNotEqual(model_fingerprint(self.model), fingerprint)
+        new_path = prepare_onnx(self.model, self.onnx_dir, quantize=False)
+        self.assertNotEqual(new_path, path)
+        self.assertTrue(os.path.exists(new_path))
+
+    def test_cache_namespace_follows_weights(self):
+        def load() -> str:
+            cache = PredictionCache("stale", str.lower)
+            with mock.patch.object(ml_service, "cache", cache), mock.patch.object(
+                ml_service, "classifier", None
+            ), mock.patch.multiple(
+                get_settings(),
+                model_name=self.model,
+                inference_backend="torch",
+                inference_shards=1,
+            ):
+                ml_service.load_model()
+            return cache.namespace
+
+        namespace = load()
+        self.assertEqual(
+            namespace, f"{self.model}:torch:{model_fingerprint(self.model)}"
+        )
+        self.retrain()
+        self.assertNotEqual(load(), namespace)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
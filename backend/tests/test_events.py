@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from app.services.events import TaskEvents
+from app.services.ml_service import ml_service
+
+
+class TestTaskEvents(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.events = TaskEvents()
+
+    async def test_notify_wakes_waiter(self):
+        seen = self.events.version("a")
+        waiter = asyncio.create_task(self.events.wait("a", seen, timeout=5))
+        await asyncio.sleep(0)
+        self.events.notify("a")
+        self.assertTrue(await waiter)
+        self.assertNotEqual(self.events.version("a"), seen)
+
+    async def test_timeout_without_changes(self):
+        self.assertFalse(await self.events.wait("a", self.events.version("a"), 0.01))
+
+    async def test_change_before_wait_is_not_lost(self):
+        seen = self.events.version("a")
+        self.events.notify("a")
+        self.events.notify("a")
+        self.assertTrue(await self.events.wait("a", seen, timeout=0.01))
+
+    async def test_other_task_does_not_wake(self):
+        seen = self.events.version("a")
+        waiter = asyncio.create_task(self.events.wait("a", seen, timeout=0.05))
+        await asyncio.sleep(0)
+        self.events.notify("b")
+        self.assertFalse(await waiter)
+
+    async def test_notify_all_wakes_every_task(self):
+        waiters = [
+            asyncio.create_task(self.events.wait(task, self.events.version(task), 5))
+            for task in ("a", "b")
+        ]
+        seen = self.events.version("c")
+        await asyncio.sleep(0)
+        self.events.notify_all()
+        self.assertEqual(await asyncio.gather(*waiters), [True, True])
+        self.assertNotEqual(self.events.version("c"), seen)
+
+
+class TestEvictionFromThread(unittest.IsolatedAsyncioTestCase):
+
+    async def test_forget_from_worker_thread_runs_on_loop(self):
+        ml_service.create_task("evicted")
+        self.addCleanup(ml_service.tasks.pop, "evicted", None)
+        seen = ml_service.events.version("evicted")
+        waiter = asyncio.create_task(ml_service.events.wait("evicted", seen, 5))
+        await asyncio.sleep(0)
+
+        drop = ml_service._drop_task
+        threads = []
+
+        def record(task_id):
+            threads.append(threading.get_ident())
+            drop(task_id)
+
+        with mock.patch.object(ml_service, "_drop_task", side_effect=record):
+            await asyncio.to_thread(ml_service._forget, "evicted")
+            self.assertTrue(await asyncio.wait_for(waiter, 1))
+        self.assertEqual(threads, [threading.get_ident()])
+        self.assertNotIn("evicted", ml_service.tasks)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
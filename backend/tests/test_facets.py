@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.services.facets import FacetIndex
+
+
+class TestFacetIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "text": list("abcdef"),
+                "src": ["ozon", "wb", "ozon", None, "wb", "ozon"],
+                "label": [2, 0, 1, 2, 2, 0],
+            }
+        )
+        self.facets = FacetIndex.build(self.df)
+
+    def test_rows(self):
+        self.assertEqual(self.facets.rows(label=2).tolist(), [0, 3, 4])
+        self.assertEqual(self.facets.rows(src="ozon").tolist(), [0, 2, 5])
+        self.assertEqual(self.facets.rows(label=0, src="ozon").tolist(), [5])
+        self.assertEqual(self.facets.rows(label=1, src="wb").tolist(), [])
+        self.assertIsNone(self.facets.rows())
+
+    def test_source_ignored_without_src_column(self):
+        facets = FacetIndex.build(self.df.drop(columns="src"))
+        self.assertIsNone(facets.rows(src="ozon"))
+        self.assertEqual(facets.rows(label=2, src="ozon").tolist(), [0, 3, 4])
+
+    def test_stats(self):
+        self.assertEqual(
+            self.facets.stats(),
+            {"total": 6, "negative": 2, "neutral": 1, "positive": 3},
+        )
+
+    def test_relabel_matches_rebuild(self):
+        self.facets.relabel(4, 2, 1)
+        self.facets.relabel(3, 2, 0)
+        self.df.loc[4, "label"] = 1
+        self.df.loc[3, "label"] = 0
+        rebuilt = FacetIndex.build(self.df)
+
+        self.assertEqual(self.facets.stats(), rebuilt.stats())
+        for label in (0, 1, 2):
+            for src in (None, "ozon", "wb"):
+                self.assertEqual(
+                    self.facets.rows(label, src).tolist(),
+                    rebuilt.rows(label, src).tolist(),
+                )
+
+    def test_extend_by_chunks_matches_build(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(
+            {
+                "label": rng.integers(0, 3, 1000),
+                "src": rng.choice(["ozon", "wb", None], 1000),
+            },
+            index=np.arange(5000, 6000),
+        )
+        facets = FacetIndex()
+        for start in range(0, 1000, 137):
+            facets.extend(df.iloc[start : start + 137])
+            self.assertEqual(facets.stats()["total"], min(start + 137, 1000))
+        built = FacetIndex.build(df)
+
+        self.assertEqual(facets.stats(), built.stats())
+        for label in (None, 0, 1, 2):
+            for src in (None, "ozon", "wb"):
+                rows = facets.rows(label, src)
+                expected = built.rows(label, src)
+                if expected is None:
+                    self.assertIsNone(rows)
+                else:
+                    self.assertEqual(rows.tolist(), expected.tolist())
+        self.assertEqual(facets.src_of.tolist(), built.src_of.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+import unittest
+
+from app.models.preprocessing import TextPreprocessor
+
+
+class TestLemmaCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.reference = TextPreprocessor(lemma_cache_size=0)
+
+    def setUp(self):
+        self.preprocessor = TextPreprocessor(lemma_cache_size=1000)
+        self.preprocessor._morph = self.reference.morph
+
+    def test_matches_uncached_parse(self):
+        text = "курьеры доставили товары быстро"
+        self.assertEqual(
+            self.preprocessor.lemmatize(text), self.reference.lemmatize(text)
+        )
+        self.assertEqual(
+            self.preprocessor.lemmatize(text), "курьер доставить товар быстро"
+        )
+
+    def test_repeated_words_parsed_once(self):
+        self.preprocessor.lemmatize("товары товары товары")
+        self.preprocessor.lemmatize("товары")
+        stats = self.preprocessor.lemma_stats()
+        self.assertEqual(stats["tokens"], 4)
+        self.assertEqual(stats["parsed"], 1)
+        self.assertEqual(stats["hit_rate"], 0.75)
+
+    def test_batch_parses_unique_vocabulary(self):
+        texts = ["доставка была быстрой", "быстрой доставка", "", "доставка"]
+        expected = [self.reference.lemmatize(t) for t in texts]
+        self.assertEqual(self.preprocessor.lemmatize_batch(texts), expected)
+        stats = self.preprocessor.lemma_stats()
+        self.assertEqual(stats["tokens"], 6)
+        self.assertEqual(stats["parsed"], 3)
+
+    def test_cache_is_bounded(self):
+        preprocessor = TextPreprocessor(lemma_cache_size=2)
+        preprocessor._morph = self.reference.morph
+        preprocessor.lemmatize_batch(["один два три четыре"])
+        self.assertEqual(preprocessor.lemma_stats()["cache_size"], 2)
+
+    def test_preprocess_batch(self):
+        result = self.preprocessor.preprocess_batch(
+            ["Товары, ДОСТАВКА!", None], lemmatize=True
+        )
+        self.assertEqual(result, ["товар доставка", ""])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+from prometheus_client import CollectorRegistry, generate_latest
+
+from app.core.metrics import ServiceCollector
+from app.models.preprocessing import TextPreprocessor
+from app.services.executor import InferenceExecutor
+from app.services.facets import FacetIndex
+from app.services.result_store import ResultStore
+from app.services.scheduler import JobScheduler
+
+
+class ServiceCollectorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.executor = InferenceExecutor(1, 1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def scrape(self, service):
+        registry = CollectorRegistry()
+        registry.register(ServiceCollector(service))
+        return generate_latest(registry).decode()
+
+    def test_reports_tasks_store_and_caches(self):
+        results = ResultStore(self.directory)
+        results.put("done", pd.DataFrame({"text": ["a", "b"], "label": [0, 1]}))
+        service = SimpleNamespace(
+            scheduler=JobScheduler(),
+            executor=self.executor,
+            tasks={
+                "done": {"status": "completed", "memory_bytes": 100},
+                "busy": {"status": "processing"},
+                "other": {"status": "processing"},
+            },
+            results=results,
+            cache=None,
+            preprocessor=TextPreprocessor(),
+        )
+        body = self.scrape(service)
+        self.assertIn('sentiment_tasks{status="processing"} 2.0', body)
+        self.assertIn('sentiment_tasks{status="completed"} 1.0', body)
+        self.assertIn("sentiment_task_memory_bytes 100.0", body)
+        self.assertIn("sentiment_jobs_queued 0.0", body)
+        self.assertIn("sentiment_lemma_cache_hits_total 0.0", body)
+        self.assertNotIn("sentiment_prediction_cache", body)
+        disk = results.stats()["disk_bytes"]
+        self.assertIn(f"sentiment_result_store_bytes {float(disk)}", body)
+
+
+class IndexSizeTest(unittest.TestCase):
+    def test_facet_nbytes_counts_row_arrays(self):
+        df = pd.DataFrame({"label": [0, 1, 1, 2], "src": ["a", "a", "b", "b"]})
+        facets = FacetIndex.build(df)
+        # 4 строки по меткам, 4 по источникам, 4 по парам и массив src_of
+        self.assertEqual(facets.nbytes(), 3 * 4 * 8 + facets.src_of.nbytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+
+from app.services.micro_batcher import MicroBatcher
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.calls = []
+
+        async def predict(texts):
+            self.calls.append(list(texts))
+            return [len(t) for t in texts]
+
+        self.batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=20)
+
+    async def asyncTearDown(self):
+        self.batcher.stop()
+
+    async def test_concurrent_requests_merged(self):
+        results = await asyncio.gather(
+            *[self.batcher.submit(["x" * i]) for i in range(1, 4)]
+        )
+        self.assertEqual(results, [[1], [2], [3]])
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_max_batch_size_respected(self):
+        results = await self.batcher.submit(["a", "bb", "ccc", "dddd", "eeeee"])
+        self.assertEqual(results, [1, 2, 3, 4, 5])
+        self.assertEqual([len(c) for c in self.calls], [4, 1])
+
+    async def test_errors_propagate_to_callers(self):
+        async def failing(texts):
+            raise RuntimeError("boom")
+
+        self.batcher.predict_fn = failing
+        with self.assertRaises(RuntimeError):
+            await self.batcher.submit(["a"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from app.services.executor import InferenceExecutor
+from app.services.ml_service import ml_service
+from app.services.result_store import ResultStore
+
+
+class TaskLifecycleTest(unittest.IsolatedAsyncioTestCase):
+    """Жизненный цикл задач без модели: инференс подменён"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        store = ResultStore(
+            self.directory, ttl_seconds=0.2, on_evict=ml_service._forget
+        )
+        executor = InferenceExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        for patcher in (
+            mock.patch.object(ml_service, "results", store),
+            mock.patch.object(ml_service, "executor", executor),
+            mock.patch.object(ml_service, "predict_cached", self.fake_predict),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_predict(self, texts):
+        return [(len(text) % 3, 0.5) for text in texts]
+
+    def write_csv(self, content: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=".csv", dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        return path
+
+    def start(self, task_id: str, content: str) -> asyncio.Task:
+        ml_service.create_task(task_id)
+        self.addCleanup(ml_service.tasks.pop, task_id, None)
+        return ml_service.submit_csv(self.write_csv(content), task_id)
+
+    async def test_cancelled_task_expires(self):
+        ml_service.create_task("cancelled")
+        self.addCleanup(ml_service.tasks.pop, "cancelled", None)
+        self.assertTrue(ml_service.cancel_task("cancelled"))
+        task = ml_service.tasks["cancelled"]
+        self.assertEqual(task["status"], "cancelled")
+        self.assertNotIn("partial", task)
+        await asyncio.sleep(0.3)
+        self.assertNotIn("cancelled", ml_service.tasks)
+
+    async def test_failed_task_expires(self):
+        job = self.start("failed", "text\n\"unterminated\n")
+        await job
+        self.assertEqual(ml_service.tasks["failed"]["status"], "failed")
+        await asyncio.sleep(0.3)
+        self.assertNotIn("failed", ml_service.tasks)
+
+    async def test_cancel_while_storing_discards_result(self):
+        store = ml_service._store_result
+        storing = threading.Event()
+
+        def slow_store(task, df):
+            storing.set()
+            time.sleep(0.1)
+            store(task, df)
+
+        with mock.patch.object(ml_service, "_store_result", side_effect=slow_store):
+            job = self.start("storing", "text\nраз\nдва\n")
+            await asyncio.to_thread(storing.wait, 5)
+            self.assertTrue(ml_service.cancel_task("storing"))
+            with self.assertRaises(asyncio.CancelledError):
+                await job
+        task = ml_service.tasks["storing"]
+        self.assertEqual(task["status"], "cancelled")
+        self.assertNotIn("partial", task)
+        self.assertIsNone(ml_service.results.get("storing"))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    async def test_result_loads_off_the_loop(self):
+        ml_service.results.put("done", pd.DataFrame({"text": ["a"], "label": [0]}))
+        get = ml_service.results.get
+        threads = []
+
+        def record(task_id):
+            threads.append(threading.get_ident())
+            return get(task_id)
+
+        with mock.patch.object(ml_service.results, "get", side_effect=record):
+            df = await ml_service.load_result("done")
+        self.assertEqual(df["text"].tolist(), ["a"])
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
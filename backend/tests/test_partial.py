@@ -0,0 +1,119 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import get_settings
+from app.services.executor import InferenceExecutor
+from app.services.ml_service import ml_service
+from app.services.partial import LabelBlock, PartialResult, first_rows
+
+
+class FirstRowsTest(unittest.TestCase):
+    def test_first_occurrence_of_each_text(self):
+        codes, uniques = pd.factorize(pd.Series(["a", "b", "a", "c", "b", "d"]))
+        self.assertEqual(first_rows(codes).tolist(), [0, 1, 3, 5])
+        self.assertEqual(len(first_rows(codes)), len(uniques))
+
+    def test_empty(self):
+        self.assertEqual(first_rows(np.empty(0, dtype=np.int64)).tolist(), [])
+
+
+class PartialResultTest(unittest.TestCase):
+    def test_appended_chunks_are_queryable(self):
+        partial = PartialResult()
+        self.assertEqual(len(partial.frame()), 0)
+        partial.append(
+            pd.DataFrame({"text": ["a", "b"], "label": [2, 0]}, index=[10, 11])
+        )
+        partial.append(pd.DataFrame({"text": [], "label": []}))
+        partial.append(pd.DataFrame({"text": ["c"], "label": [2]}, index=[12]))
+
+        frame = partial.frame()
+        self.assertEqual(frame["text"].tolist(), ["a", "b", "c"])
+        self.assertEqual(frame.index.tolist(), [0, 1, 2])
+        self.assertIs(partial.frame(), frame)
+        self.assertEqual(len(partial), 3)
+        self.assertEqual(
+            partial.facets.stats(),
+            {"total": 3, "negative": 1, "neutral": 0, "positive": 2},
+        )
+        self.assertEqual(partial.facets.rows(label=2).tolist(), [0, 2])
+
+
+class LabelBlockTest(unittest.TestCase):
+    def test_out_of_order_chunks_publish_prefix(self):
+        df = pd.DataFrame({"text": ["a", "b", "a", "c", "d", "b"]})
+        block = LabelBlock(df, chunk_size=2)
+        self.assertEqual(list(block.starts()), [0, 2])
+
+        self.assertEqual(block.fill(2, [(2, 0.9), (0, 0.8)]), 3)
+        self.assertIsNone(block.take_ready())
+        self.assertEqual(block.fill(0, [(1, 0.7), (2, 0.6)]), 3)
+        ready = block.take_ready()
+        self.assertEqual(ready["label"].tolist(), [1, 2, 1, 2, 0, 2])
+        self.assertTrue(block.done)
+
+
+class LabelPipelineTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        executor = InferenceExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+        for patcher in (
+            mock.patch.multiple(get_settings(), inference_chunk_size=2),
+            mock.patch.object(ml_service, "executor", executor),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.published_on_read = []
+
+    def fake_predict(self, texts):
+        time.sleep(0.02)
+        if "boom" in texts:
+            raise RuntimeError("boom")
+        return [(len(text) % 3, 0.5) for text in texts]
+
+    async def label(self, frames):
+        task = ml_service.create_task("pipeline")
+
+        async def stream():
+            for df in frames:
+                self.published_on_read.append(len(task["partial"]))
+                yield df
+
+        self.addCleanup(ml_service.tasks.pop, "pipeline", None)
+        with mock.patch.object(ml_service, "predict_cached", self.fake_predict):
+            partial = await ml_service._label_frames(stream(), task)
+        self.assertIs(partial, task["partial"])
+        return task, partial
+
+    async def test_rows_keep_file_order(self):
+        frames = [
+            pd.DataFrame({"text": [f"b{block} {i % 20}" for i in range(30)]})
+            for block in range(4)
+        ]
+        task, partial = await self.label(frames)
+        df = partial.frame()
+        expected = pd.concat(frames, ignore_index=True)["text"]
+        self.assertEqual(df["text"].tolist(), expected.tolist())
+        self.assertEqual(df["label"].tolist(), [len(t) % 3 for t in expected])
+        self.assertEqual(task["progress"], 120)
+        # Текстовый индекс собран по CSV-чанкам вместе с разметкой
+        self.assertEqual(partial.index.total, 120)
+        self.assertEqual(partial.index.lookup("b2 7").tolist(), [67, 87])
+        # Следующий CSV-чанк читается, пока предыдущий ещё в разметке
+        self.assertLess(self.published_on_read[1], 30)
+
+    async def test_error_cancels_remaining_chunks(self):
+        frames = [pd.DataFrame({"text": [f"b0 {i}" for i in range(40)] + ["boom"]})]
+        with self.assertRaises(RuntimeError):
+            await self.label(frames)
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        self.assertEqual(pending, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import json
+import marshal
+import threading
+import unittest
+import zipfile
+
+from app.services.profiling import JobProfiler, profiled
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+class JobProfilerTest(unittest.TestCase):
+    def test_unprofiled_function_is_untouched(self):
+        self.assertIs(profiled(None, "inference", busy), busy)
+
+    def test_merges_calls_from_threads(self):
+        profiler = JobProfiler("cprofile")
+        run = profiled(profiler, "inference", busy)
+        threads = [threading.Thread(target=run, args=(10_000,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        summary = profiler.summary(top=50)
+        self.assertEqual(summary["stages"]["inference"]["calls"], 3)
+        functions = {row["function"]: row for row in summary["cprofile"]}
+        busy_row = next(row for name, row in functions.items() if "(busy)" in name)
+        self.assertEqual(busy_row["calls"], 3)
+        self.assertNotIn("torch", summary)
+
+    def test_wrap_iter_profiles_each_item(self):
+        profiler = JobProfiler("cprofile")
+        items = list(profiler.wrap_iter("serialize", iter([1, 2, 3])))
+        self.assertEqual(items, [1, 2, 3])
+        # Три элемента и завершающий вызов next
+        self.assertEqual(profiler.summary()["stages"]["serialize"]["calls"], 4)
+
+    def test_artifact_contains_summary_and_pstats(self):
+        profiler = JobProfiler("cprofile")
+        profiler.wrap("store", busy)(1000)
+        profiler.record("job", 1.5)
+        archive = zipfile.ZipFile(io.BytesIO(profiler.artifact()))
+        self.assertEqual(archive.namelist(), ["summary.json", "cprofile.prof"])
+        summary = json.loads(archive.read("summary.json"))
+        self.assertEqual(summary["stages"]["job"], {"calls": 1, "seconds": 1.5})
+        stats = marshal.loads(archive.read("cprofile.prof"))
+        self.assertTrue(any(func[2] == "busy" for func in stats))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            JobProfiler("perf")
+
+
+if __name__ == "__main__":
+    unittest.main()
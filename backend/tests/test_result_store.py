@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from app.services.result_store import ResultStore
+
+
+def make_frame(n=10):
+    return pd.DataFrame(
+        {"text": [f"текст {i}" for i in range(n)], "label": [i % 3 for i in range(n)]}
+    )
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.evicted = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_store(self, **kwargs):
+        return ResultStore(self.directory, on_evict=self.evicted.append, **kwargs)
+
+    def test_roundtrip(self):
+        store = self.make_store()
+        store.put("a", make_frame())
+        df = store.get("a")
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df["label"].tolist(), make_frame()["label"].tolist())
+        self.assertIsNone(store.get("missing"))
+
+    def test_discard_skips_evict_callback(self):
+        store = self.make_store()
+        store.put("a", make_frame())
+        store.get("a")
+        store.discard("a")
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(self.evicted, [])
+
+    def test_ttl_evicts(self):
+        store = self.make_store(ttl_seconds=-1)
+        store.put("a", make_frame())
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(self.evicted, ["a"])
+        self.assertEqual(store.stats()["disk_bytes"], 0)
+
+    def test_disk_budget_evicts_least_recently_read(self):
+        store = self.make_store()
+        store.put("a", make_frame())
+        store.put("b", make_frame())
+        store.get("a")
+        store.max_disk_bytes = store.disk_usage() - 1
+        store.sweep()
+        self.assertEqual(self.evicted, ["b"])
+        self.assertIsNotNone(store.get("a"))
+
+    def test_dirty_frame_written_back(self):
+        store = self.make_store(max_open=1)
+        store.put("a", make_frame())
+        df = store.get("a")
+        df.loc[0, "label"] = 2
+        store.mark_dirty("a")
+        store.put("b", make_frame())
+        store.get("b")
+        self.assertEqual(store.get("a")["label"].iloc[0], 2)
+
+    def test_oversized_new_result_is_kept(self):
+        store = self.make_store(max_disk_bytes=1)
+        store.put("a", make_frame())
+        store.put("b", make_frame())
+        self.assertEqual(self.evicted, ["a"])
+        self.assertIsNotNone(store.get("b"))
+
+    def test_files_from_previous_run_are_adopted(self):
+        store = self.make_store()
+        store.put("a", make_frame())
+        store.put("b", make_frame())
+        usage = store.disk_usage()
+
+        restarted = self.make_store()
+        self.assertEqual(restarted.stats()["tasks"], 2)
+        self.assertEqual(restarted.disk_usage(), usage)
+        labels = restarted.get("a")["label"].tolist()
+        self.assertEqual(labels, make_frame()["label"].tolist())
+
+        restarted.max_disk_bytes = usage - 1
+        restarted.put("c", make_frame())
+        self.assertEqual(self.evicted, ["b", "a"])
+
+    def test_expired_files_from_previous_run_are_removed(self):
+        self.make_store().put("a", make_frame())
+        store = self.make_store(ttl_seconds=-1)
+        self.assertEqual(store.stats()["tasks"], 0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import router
+from app.core.config import get_settings
+from app.services.ml_service import ml_service
+from app.services.result_store import ResultStore
+
+
+class RoutesTestCase(unittest.TestCase):
+    """Эндпоинты без модели: готовый результат кладётся в сервис напрямую"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        store = ResultStore(self.directory, on_evict=ml_service._forget)
+        patcher = mock.patch.object(ml_service, "results", store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app)
+
+    def complete_task(self, task_id: str, df: pd.DataFrame):
+        task = ml_service.create_task(task_id, len(df))
+        ml_service._store_result(task, df)
+        task["status"] = "completed"
+        task.pop("partial", None)
+        self.addCleanup(ml_service.tasks.pop, task_id, None)
+
+    def patch_settings(self, **values):
+        patcher = mock.patch.multiple(get_settings(), **values)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestResultPages(RoutesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.df = pd.DataFrame(
+            {
+                "text": [f"отзыв {i}" for i in range(25)],
+                "src": ["ozon", "wb"] * 12 + ["ozon"],
+                "label": [i % 3 for i in range(25)],
+                "confidence": [0.5] * 25,
+            }
+        )
+        self.complete_task("done", self.df)
+
+    def test_offset_and_limit(self):
+        body = self.client.get("/api/results/done?offset=20&limit=10").json()
+        self.assertEqual(body["status"], "completed")
+        texts = [row["text"] for row in body["data"]]
+        self.assertEqual(texts, self.df["text"][20:].tolist())
+        self.assertEqual(
+            body["pagination"],
+            {"offset": 20, "limit": 10, "total": 25, "next_offset": None},
+        )
+        self.assertEqual(
+            body["stats"], {"total": 25, "negative": 9, "neutral": 8, "positive": 8}
+        )
+
+    def test_default_and_max_page_size(self):
+        self.patch_settings(default_page_size=4, max_page_size=6)
+        body = self.client.get("/api/results/done").json()
+        self.assertEqual(len(body["data"]), 4)
+        self.assertEqual(body["pagination"]["next_offset"], 4)
+        body = self.client.get("/api/results/done?limit=100").json()
+        self.assertEqual(body["pagination"]["limit"], 6)
+
+    def test_fields(self):
+        body = self.client.get("/api/results/done?limit=2&fields=text,label").json()
+        self.assertEqual(
+            body["data"],
+            [{"text": "отзыв 0", "label": 0}, {"text": "отзыв 1", "label": 1}],
+        )
+        response = self.client.get("/api/results/done?fields=text,nope")
+        self.assertEqual(response.status_code, 400)
+
+    def test_ndjson_streams_whole_selection(self):
+        response = self.client.get(
+            "/api/filter?task_id=done&label=2&format=ndjson&limit=1"
+        )
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([r["text"] for r in rows], self.df["text"][2::3].tolist())
+
+    def test_filter_pages(self):
+        body = self.client.get(
+            "/api/filter?task_id=done&label=0&source=ozon&limit=2"
+        ).json()
+        texts = [row["text"] for row in body["results"]]
+        self.assertEqual(texts, ["отзыв 0", "отзыв 6"])
+        self.assertEqual(body["pagination"]["total"], 5)
+
+    def test_unknown_task(self):
+        self.assertEqual(self.client.get("/api/results/missing").status_code, 404)
+        response = self.client.get("/api/filter?task_id=missing")
+        self.assertEqual(response.status_code, 404)
+
+
+class TestUpload(RoutesTestCase):
+
+    def test_file_over_limit_is_rejected(self):
+        self.patch_settings(max_file_size=100)
+        tasks = set(ml_service.tasks)
+        with mock.patch("app.api.routes.os.remove", side_effect=os.remove) as remove:
+            response = self.client.post(
+                "/api/analyze",
+                files={"file": ("a.csv", "text\n" + "x" * 200, "text/csv")},
+            )
+        self.assertEqual(response.status_code, 413)
+        # Недокачанный временный файл удалён
+        remove.assert_called_once()
+        self.assertFalse(os.path.exists(remove.call_args.args[0]))
+        self.assertEqual(set(ml_service.tasks), tasks)
+
+    def test_only_csv(self):
+        response = self.client.post(
+            "/api/analyze", files={"file": ("a.txt", "text\nx", "text/plain")}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_text_column_required(self):
+        response = self.client.post(
+            "/api/analyze", files={"file": ("a.csv", "review\nx", "text/csv")}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TestValidate(RoutesTestCase):
+
+    def post(self, csv: str):
+        return self.client.post(
+            "/api/validate", files={"file": ("v.csv", csv, "text/csv")}
+        )
+
+    def test_text_labels_are_rejected(self):
+        response = self.post("label,true_label\npositive,positive\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'positive'", response.json()["detail"])
+
+    def test_missing_labels_are_skipped(self):
+        body = self.post("label,true_label\n1,1\n,2\n2,0\n").json()
+        self.assertEqual(body["rows"], 2)
+        self.assertEqual(body["accuracy"], 0.5)
+
+
+class TestTaskEvents(RoutesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.patch_settings(events_heartbeat_seconds=0.05, events_min_interval_ms=0)
+        self.task = ml_service.create_task("streaming", total=2)
+        self.addCleanup(ml_service.tasks.pop, "streaming", None)
+        # Event ожидания привязан к циклу запроса TestClient
+        self.addCleanup(ml_service.events.forget, "streaming")
+
+    def events(self, finish, delay: float = 0.3):
+        """Читает поток, пока задачу в фоне не завершит finish"""
+        timer = threading.Timer(delay, finish)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        response = self.client.get("/api/results/streaming/events")
+        self.assertEqual(response.status_code, 200)
+        content_type = response.headers["content-type"]
+        self.assertTrue(content_type.startswith("text/event-stream"))
+        return response.text.split("\n\n")[:-1]
+
+    def test_heartbeat_then_final_event(self):
+        df = pd.DataFrame({"text": ["а", "б"], "label": [0, 2], "confidence": [1, 1]})
+
+        def complete():
+            ml_service._store_result(self.task, df)
+            self.task.pop("partial", None)
+            self.task["status"] = "completed"
+
+        messages = self.events(complete)
+        self.assertTrue(messages[0].startswith("retry: "))
+        self.assertTrue(messages[1].startswith("event: progress\n"))
+        self.assertIn(": heartbeat", messages)
+        # Без изменений состояния повторных progress нет, только heartbeat
+        self.assertEqual(sum(m.startswith("event: progress") for m in messages), 1)
+        event, data = messages[-1].split("\n")
+        self.assertEqual(event, "event: completed")
+        body = json.loads(data.removeprefix("data: "))
+        self.assertEqual(body["status"], "completed")
+        self.assertEqual(body["stats"]["total"], 2)
+
+    def test_failed_task(self):
+        def fail():
+            self.task.update(status="failed", error="boom")
+
+        messages = self.events(fail)
+        self.assertEqual(
+            messages[-1],
+            'event: failed\ndata: {"status": "failed", "error": "boom"}',
+        )
+
+    def test_forgotten_task_expires(self):
+        messages = self.events(lambda: ml_service.tasks.pop("streaming", None))
+        self.assertEqual(messages[-1], 'event: expired\ndata: {"status": "expired"}')
+
+    def test_unknown_task(self):
+        response = self.client.get("/api/results/missing/events")
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
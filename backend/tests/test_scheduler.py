@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+
+from app.services.scheduler import JobScheduler
+
+
+class TestJobScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.order = []
+
+    async def job(self, scheduler, job_id, chunks, cost=1):
+        async def chunk(i):
+            async with scheduler.turn(job_id, cost):
+                await asyncio.sleep(0.001)
+                self.order.append(job_id)
+
+        await asyncio.gather(*(chunk(i) for i in range(chunks)))
+        return job_id
+
+    async def test_small_job_interleaves_with_big_one(self):
+        scheduler = JobScheduler(max_running=2, slots=1)
+        big = scheduler.submit("big", lambda: self.job(scheduler, "big", 50))
+        await asyncio.sleep(0.005)
+        small = scheduler.submit("small", lambda: self.job(scheduler, "small", 3))
+        await small
+        self.assertLess(self.order.index("small"), 10)
+        self.assertLess(len(self.order), 20)
+        await big
+
+    async def test_priority_gets_larger_share(self):
+        scheduler = JobScheduler(max_running=2, slots=1)
+        low = scheduler.submit("low", lambda: self.job(scheduler, "low", 30), 1)
+        high = scheduler.submit("high", lambda: self.job(scheduler, "high", 30), 3)
+        await high
+        self.assertGreater(len([j for j in self.order if j == "high"]), 20)
+        self.assertLess(len([j for j in self.order if j == "low"]), 15)
+        await low
+
+    async def test_queue_position_and_admission_by_priority(self):
+        scheduler = JobScheduler(max_running=1, slots=1)
+        gate = asyncio.Event()
+        first = scheduler.submit("first", gate.wait)
+        a = scheduler.submit("a", lambda: self.job(scheduler, "a", 1), 1)
+        b = scheduler.submit("b", lambda: self.job(scheduler, "b", 1), 5)
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.position("first"), 0)
+        self.assertEqual(scheduler.position("b"), 1)
+        self.assertEqual(scheduler.position("a"), 2)
+        self.assertIsNone(scheduler.position("missing"))
+
+        gate.set()
+        await asyncio.gather(first, a, b)
+        self.assertEqual(self.order, ["b", "a"])
+
+    async def test_cancel_running_and_queued(self):
+        scheduler = JobScheduler(max_running=1, slots=1)
+        running = scheduler.submit("running", lambda: asyncio.sleep(10))
+        queued = scheduler.submit("queued", lambda: asyncio.sleep(10))
+        await asyncio.sleep(0)
+
+        self.assertTrue(scheduler.cancel("queued"))
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+        self.assertTrue(scheduler.cancel("running"))
+        with self.assertRaises(asyncio.CancelledError):
+            await running
+        self.assertFalse(scheduler.cancel("running"))
+        self.assertEqual(
+            scheduler.stats(), {"running": 0, "queued": 0, "active_batches": 0}
+        )
+
+    async def test_cancel_releases_batch_slot(self):
+        scheduler = JobScheduler(max_running=2, slots=1)
+        stuck = scheduler.submit("stuck", lambda: self.job(scheduler, "stuck", 5))
+        await asyncio.sleep(0)
+        scheduler.cancel("stuck")
+        with self.assertRaises(asyncio.CancelledError):
+            await stuck
+        follow_up = scheduler.submit("next", lambda: self.job(scheduler, "next", 2))
+        self.assertEqual(await follow_up, "next")
+        self.assertEqual(scheduler.stats()["active_batches"], 0)
+
+    async def test_cancel_does_not_break_other_jobs(self):
+        scheduler = JobScheduler(max_running=2, slots=1)
+        doomed = scheduler.submit("doomed", lambda: self.job(scheduler, "doomed", 20))
+        other = scheduler.submit("other", lambda: self.job(scheduler, "other", 20))
+        await asyncio.sleep(0.01)
+        scheduler.cancel("doomed")
+        self.assertEqual(await other, "other")
+        with self.assertRaises(asyncio.CancelledError):
+            await doomed
+        self.assertEqual(self.order.count("other"), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.config import get_settings
+from app.services.ml_service import ml_service
+
+from .test_classifier import build_tiny_model
+
+
+class ReadyTestCase(unittest.TestCase):
+    """/ready и MLService.startup; lifespan приложения не запускается"""
+
+    def setUp(self):
+        for patcher in (
+            mock.patch.multiple(
+                ml_service, ready=False, startup_error=None, startup_timings={}
+            ),
+            mock.patch.multiple(
+                get_settings(), preload_model=True, warmup_batches=0
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = TestClient(main.app)
+
+    def ready(self):
+        response = self.client.get("/ready")
+        return response.status_code, response.json()
+
+
+class TestReadyTransitions(ReadyTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(ml_service.preprocessor, "load")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_starting_then_ready(self):
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_load():
+            loading.set()
+            release.wait(5)
+
+        with mock.patch.object(ml_service, "load_model", side_effect=slow_load):
+            thread = threading.Thread(target=ml_service.startup)
+            thread.start()
+            self.assertTrue(loading.wait(5))
+            self.assertEqual(self.ready(), (503, {"status": "starting"}))
+            release.set()
+            thread.join(5)
+
+        status, body = self.ready()
+        self.assertEqual(status, 200)
+        self.assertEqual(body["status"], "ready")
+        self.assertEqual(
+            set(body["startup_seconds"]), {"preprocessor", "model", "warmup", "total"}
+        )
+        self.assertEqual(self.client.get("/health").status_code, 200)
+
+    def test_failed_startup(self):
+        error = RuntimeError("model not found")
+        with mock.patch.object(ml_service, "load_model", side_effect=error):
+            with self.assertLogs("uvicorn.error", "ERROR"):
+                asyncio.run(main._warm_up())
+        self.assertEqual(
+            self.ready(), (503, {"status": "failed", "error": "model not found"})
+        )
+        self.assertFalse(ml_service.ready)
+
+    def test_lazy_model_when_preload_disabled(self):
+        get_settings().preload_model = False
+        with mock.patch.object(ml_service, "load_model") as load_model:
+            ml_service.startup()
+        load_model.assert_not_called()
+        self.assertEqual(self.ready()[0], 200)
+
+
+class TestOfflineStartup(ReadyTestCase):
+    """Старт с моделью по локальному пути при недоступной сети"""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model = build_tiny_model(os.path.join(self.tmp.name, "model"))
+        for patcher in (
+            mock.patch.multiple(
+                get_settings(),
+                model_name=self.model,
+                inference_backend="torch",
+                inference_shards=1,
+                warmup_batches=1,
+            ),
+            mock.patch.multiple(
+                ml_service, classifier=None, shards=None, cache=None
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_local_model_starts_without_network(self):
+        def no_network(*args, **kwargs):
+            raise OSError("network is disabled in this test")
+
+        with mock.patch.object(socket.socket, "connect", no_network), mock.patch(
+            "socket.create_connection", no_network
+        ):
+            asyncio.run(main._warm_up())
+
+        self.assertIsNone(ml_service.startup_error)
+        self.assertIsNotNone(ml_service.classifier)
+        status, body = self.ready()
+        self.assertEqual(status, 200)
+        self.assertIn("model", body["startup_seconds"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,92 @@
+import asyncio
+import importlib.util
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from app.services.ml_service import ml_service
+from app.services.result_store import ResultStore
+from app.services.task_store import RedisTaskStore, redis_from_url
+
+
+@unittest.skipUnless(importlib.util.find_spec("fakeredis"), "fakeredis not installed")
+class TestRedisTaskStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = RedisTaskStore(redis_from_url("fakeredis://"))
+        self.store.create("t1")
+
+    def test_completes_after_all_chunks_scored(self):
+        chunks = [
+            pd.DataFrame({"text": ["a", "b"], "src": ["x", "y"]}),
+            pd.DataFrame({"text": ["c"], "src": ["z"]}),
+        ]
+        for index, chunk in enumerate(chunks):
+            self.store.push_chunk("t1", index, chunk)
+
+        self.store.save_predictions("t1", 0, [0, 2], [0.9, 0.8])
+        self.store.mark_submitted("t1", chunks=2, total=3)
+        self.assertEqual(self.store.get("t1")["status"], "processing")
+
+        self.store.save_predictions("t1", 1, [1], [0.7])
+        meta = self.store.get("t1")
+        self.assertEqual((meta["status"], meta["progress"]), ("completed", 3))
+
+        result = self.store.load_result("t1", meta["chunks"])
+        self.assertEqual(result["text"].tolist(), ["a", "b", "c"])
+        self.assertEqual(result["label"].tolist(), [0, 2, 1])
+
+    def test_submitted_after_workers_finished(self):
+        self.store.push_chunk("t1", 0, pd.DataFrame({"text": ["a"]}))
+        self.store.save_predictions("t1", 0, [2], [0.6])
+        self.store.mark_submitted("t1", chunks=1, total=1)
+        self.assertEqual(self.store.get("t1")["status"], "completed")
+
+    def test_missing_task(self):
+        self.assertIsNone(self.store.get("nope"))
+
+
+@unittest.skipUnless(importlib.util.find_spec("fakeredis"), "fakeredis not installed")
+class TestRemoteResultLoading(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.store = RedisTaskStore(redis_from_url("fakeredis://"))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        for patcher in (
+            mock.patch.object(ml_service, "store", self.store),
+            mock.patch.object(ml_service, "results", ResultStore(directory)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(ml_service.tasks.pop, "t1", None)
+
+        self.store.create("t1")
+        self.store.push_chunk("t1", 0, pd.DataFrame({"text": ["a", "b"]}))
+        self.store.save_predictions("t1", 0, [2, 0], [0.9, 0.8])
+        self.store.mark_submitted("t1", chunks=1, total=2)
+
+    async def test_result_is_loaded_once_off_the_loop(self):
+        with mock.patch.object(
+            self.store, "load_result", wraps=self.store.load_result
+        ) as load:
+            first = ml_service.get_task_status("t1")
+            second = ml_service.get_task_status("t1")
+            # Сборка ещё не началась: ответ сразу, задача пока processing
+            self.assertEqual(first["status"], "processing")
+            self.assertIs(first["loading"], second["loading"])
+            await first["loading"]
+
+        load.assert_called_once()
+        task = ml_service.get_task_status("t1")
+        self.assertEqual(task["status"], "completed")
+        self.assertNotIn("loading", task)
+        self.assertEqual(task["facets"].stats()["positive"], 1)
+        self.assertEqual(ml_service.get_result("t1")["label"].tolist(), [2, 0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from app.services.text_index import InvertedIndex
+
+
+def normalize(text):
+    return text.lower().replace("!", " ") if isinstance(text, str) else ""
+
+
+class TestInvertedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.texts = pd.Series(
+            ["Быстрая доставка", "Доволен доставкой!", None, "Товар и доставка"],
+            index=[10, 11, 12, 13],
+        )
+
+    def test_all_tokens_required(self):
+        index = InvertedIndex.build(self.texts, normalize)
+        self.assertEqual(index.lookup("доставка").tolist(), [0, 3])
+        self.assertEqual(index.lookup("ТОВАР доставка").tolist(), [3])
+        self.assertEqual(index.lookup("самовывоз").tolist(), [])
+
+    def test_lemma_keys(self):
+        lemmas = {"доставкой": "доставка"}
+        index = InvertedIndex.build(self.texts, normalize, lambda w: lemmas.get(w, w))
+        self.assertEqual(index.lookup("доставка").tolist(), [0, 1, 3])
+        self.assertEqual(index.lookup("доставкой").tolist(), [0, 1, 3])
+
+    def test_repeated_tokens_counted_once(self):
+        index = InvertedIndex.build(pd.Series(["да да да", "нет да"]), normalize)
+        self.assertEqual(index.lookup("да").tolist(), [0, 1])
+        self.assertEqual(index.lookup("да да").tolist(), [0, 1])
+
+    def test_chunks_match_single_build(self):
+        rng = np.random.default_rng(0)
+        words = [f"w{i}" for i in range(30)]
+        texts = pd.Series(
+            [" ".join(rng.choice(words, rng.integers(0, 8))) for _ in range(500)]
+        )
+        whole = InvertedIndex.build(texts, normalize)
+        with mock.patch("app.services.text_index.CHUNK_ROWS", 37):
+            chunked = InvertedIndex(normalize)
+            for start in range(0, 500, 120):
+                chunked.extend(texts[start : start + 120])
+                # Поиск работает и по несклеенным прогонам
+                self.assertEqual(
+                    chunked.lookup("w3 w7").tolist(),
+                    [row for row in whole.lookup("w3 w7") if row < start + 120],
+                )
+            chunked.compact()
+        self.assertEqual(chunked.total, 500)
+        self.assertEqual(chunked.nbytes(), whole.nbytes())
+        for query in words + ["w1 w2", "w0 w29 w15", "нет"]:
+            needed = set(query.split())
+            expected = [i for i, t in enumerate(texts) if needed <= set(t.split())]
+            self.assertEqual(chunked.lookup(query).tolist(), expected, query)
+            self.assertEqual(whole.lookup(query).tolist(), expected, query)
+
+    def test_empty_texts(self):
+        index = InvertedIndex.build(pd.Series([None, ""]), normalize)
+        self.assertEqual(index.lookup("что-то").tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
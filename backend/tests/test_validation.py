@@ -0,0 +1,102 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+
+from app.services.validation import (
+    bootstrap_macro_f1,
+    task_predictions,
+    validate_chunks,
+)
+
+
+def noisy_labels(n, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 3, n)
+    y_pred = np.where(rng.random(n) < 0.7, y_true, rng.integers(0, 3, n))
+    return y_true, y_pred
+
+
+class ValidationMetricsTest(unittest.TestCase):
+    def test_matches_sklearn(self):
+        y_true, y_pred = noisy_labels(5000)
+        metrics = validate_chunks([(y_true, y_pred)])
+        self.assertAlmostEqual(
+            metrics["macro_f1"], f1_score(y_true, y_pred, average="macro")
+        )
+        np.testing.assert_allclose(
+            list(metrics["precision"].values()),
+            precision_score(y_true, y_pred, average=None),
+        )
+        np.testing.assert_allclose(
+            list(metrics["recall"].values()),
+            recall_score(y_true, y_pred, average=None),
+        )
+        self.assertEqual(
+            metrics["confusion_matrix"], confusion_matrix(y_true, y_pred).tolist()
+        )
+        self.assertEqual(metrics["rows"], 5000)
+
+    def test_chunks_equal_single_pass(self):
+        y_true, y_pred = noisy_labels(1000)
+        chunks = [(y_true[i : i + 97], y_pred[i : i + 97]) for i in range(0, 1000, 97)]
+        self.assertEqual(
+            validate_chunks(chunks)["confusion_matrix"],
+            validate_chunks([(y_true, y_pred)])["confusion_matrix"],
+        )
+
+    def test_macro_f1_ignores_absent_class_like_sklearn(self):
+        y_true, y_pred = [0, 0, 1, 1], [0, 1, 1, 1]
+        self.assertAlmostEqual(
+            validate_chunks([(y_true, y_pred)])["macro_f1"],
+            f1_score(y_true, y_pred, average="macro"),
+        )
+
+    def test_missing_labels_are_skipped(self):
+        metrics = validate_chunks([(pd.Series([0, None, 2]), pd.Series([0, 1, 2]))])
+        self.assertEqual(metrics["rows"], 2)
+        self.assertEqual(metrics["accuracy"], 1.0)
+
+    def test_rejects_unknown_labels(self):
+        with self.assertRaises(ValueError):
+            validate_chunks([([0, 5], [0, 1])])
+
+    def test_rejects_non_numeric_and_fractional_labels(self):
+        for y_true in (["positive", "negative"], [1.7, 0]):
+            with self.subTest(y_true=y_true), self.assertRaises(ValueError):
+                validate_chunks([(pd.Series(y_true), pd.Series([0, 1]))])
+        metrics = validate_chunks([(pd.Series(["1", 2.0]), pd.Series([1, 2]))])
+        self.assertEqual(metrics["accuracy"], 1.0)
+
+    def test_bootstrap_interval(self):
+        y_true, y_pred = noisy_labels(20_000)
+        metrics = validate_chunks([(y_true, y_pred)], bootstrap=500)
+        ci = metrics["macro_f1_ci"]
+        self.assertLess(ci["low"], metrics["macro_f1"])
+        self.assertGreater(ci["high"], metrics["macro_f1"])
+        self.assertLess(ci["high"] - ci["low"], 0.05)
+        matrix = np.array(metrics["confusion_matrix"])
+        self.assertEqual(bootstrap_macro_f1(matrix, 500), ci)
+
+
+class TaskPredictionsTest(unittest.TestCase):
+    def setUp(self):
+        self.result = pd.DataFrame({"review": ["a", "b", "c"], "label": [2, 0, 1]})
+
+    def test_by_row_number(self):
+        predicted, found = task_predictions(self.result, pd.Series([2, 0, 7]), None)
+        self.assertEqual(found.tolist(), [True, True, False])
+        self.assertEqual(predicted[:2].tolist(), [1.0, 2.0])
+        self.assertTrue(np.isnan(predicted[2]))
+
+    def test_by_id_column(self):
+        predicted, found = task_predictions(
+            self.result, pd.Series(["c", "x", "a"]), "review"
+        )
+        self.assertEqual(found.tolist(), [True, False, True])
+        self.assertEqual(predicted[[0, 2]].tolist(), [1.0, 2.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
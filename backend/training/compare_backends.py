@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.models.classifier import BACKENDS, SentimentClassifier  # noqa: E402
+
+
+def run_backend(backend, texts, args):
+    classifier = SentimentClassifier(
+        args.model_name,
+        max_tokens_per_batch=args.max_tokens,
+        num_threads=args.threads,
+        backend=backend,
+        onnx_dir=args.onnx_dir,
+    )
+    classifier.predict(texts[: args.batch_size], args.batch_size)
+
+    start = time.perf_counter()
+    predictions = classifier.predict(texts, args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    labels = np.array([p[0] for p in predictions])
+    confidences = np.array([p[1] for p in predictions])
+    return labels, confidences, len(texts) / elapsed
+
+
+def print_row(*cells):
+    print(f"{cells[0]:<12}" + "".join(f"{c:>12}" for c in cells[1:]))
+
+
+def main(args):
+    df = pd.read_csv(args.sample)
+    texts = df["text"].fillna("").astype(str).tolist()
+    if args.limit:
+        texts = texts[: args.limit]
+    print(f"Текстов: {len(texts):,}")
+
+    ref_labels, ref_conf, ref_speed = run_backend("torch", texts, args)
+    report = {"torch": {"rows_per_sec": ref_speed}}
+    print_row("backend", "agreement", "mean drift", "max drift", "rows/s", "speedup")
+    print_row("torch", "1.0000", "0.0000", "0.0000", f"{ref_speed:.1f}", "1.00")
+
+    for backend in args.backends.split(","):
+        labels, conf, speed = run_backend(backend, texts, args)
+        drift = np.abs(conf - ref_conf)
+        report[backend] = {
+            "label_agreement": float((labels == ref_labels).mean()),
+            "confidence_drift_mean": float(drift.mean()),
+            "confidence_drift_max": float(drift.max()),
+            "rows_per_sec": speed,
+            "speedup": speed / ref_speed,
+        }
+        r = report[backend]
+        print_row(
+            backend,
+            f"{r['label_agreement']:.4f}",
+            f"{r['confidence_drift_mean']:.4f}",
+            f"{r['confidence_drift_max']:.4f}",
+            f"{speed:.1f}",
+            f"{r['speedup']:.2f}",
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nОтчёт сохранён: {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Сравнение бэкендов инференса с fp32 PyTorch"
+    )
+    parser.add_argument(
+        "--sample", type=str, required=True, help="CSV с колонкой text"
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        default="cardiffnlp/twitter-xlm-roberta-base-sentiment",
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        default="torch_int8,onnx,onnx_int8",
+        help=f"Через запятую, из {', '.join(BACKENDS[1:])}",
+    )
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--max_tokens", type=int, default=8192)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--onnx_dir", type=str, default="data/onnx")
+    parser.add_argument("--output", type=str, default=None, help="Куда сохранить JSON")
+    args = parser.parse_args()
+    main(args)
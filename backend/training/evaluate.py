@@ -1,28 +1,136 @@
 import argparse
+import json
+import os
+import time
 
+import numpy as np
 import pandas as pd
 import torch
-from sklearn.metrics import classification_report, confusion_matrix, f1_score
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
+LABEL_NAMES = ["Негативный", "Нейтральный", "Позитивный"]
 
-def predict_batch(texts, model, tokenizer, device, batch_size=32):
+
+def predict_batch(texts, model, tokenizer, device, batch_size=32, max_length=256):
+    """Предсказания в исходном порядке и число токенов без паддинга.
+
+    Тексты сортируются по длине, поэтому каждый батч добивается паддингом
+    только до самого длинного соседа, а не до max_length.
+    """
     model.eval()
-    predictions = []
+    encoded = tokenizer(
+        texts, truncation=True, max_length=max_length, return_token_type_ids=False
+    )["input_ids"]
+    lengths = np.array([len(ids) for ids in encoded], dtype=np.int64)
+    order = np.argsort(lengths, kind="stable")
+    predictions = np.empty(len(texts), dtype=np.int64)
 
     for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
-        encoded = tokenizer(
-            batch, padding=True, truncation=True, max_length=256, return_tensors="pt"
+        rows = order[i : i + batch_size]
+        batch = tokenizer.pad(
+            {"input_ids": [encoded[row] for row in rows]}, return_tensors="pt"
         )
-        encoded = {k: v.to(device) for k, v in encoded.items()}
+        batch = {k: v.to(device) for k, v in batch.items()}
 
         with torch.no_grad():
-            outputs = model(**encoded)
-            preds = torch.argmax(outputs.logits, dim=-1)
-            predictions.extend(preds.cpu().numpy().tolist())
+            outputs = model(**batch)
+            predictions[rows] = torch.argmax(outputs.logits, dim=-1).cpu().numpy()
+
+    return predictions, int(lengths.sum())
+
+
+def update_confusion(matrix, y_true, y_pred):
+    n = len(matrix)
+    counts = np.bincount(y_true * n + y_pred, minlength=n * n)
+    matrix += counts.reshape(n, n)
+
+
+def metrics_from_confusion(matrix):
+    """Метрики по матрице ошибок: строки — истинные метки, столбцы — предсказанные"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    tp = np.diag(matrix)
+    support = matrix.sum(axis=1)
+    predicted = matrix.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(
+            precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0
+        )
+    total = matrix.sum()
+    # Как в sklearn: усредняются классы из истинных или предсказанных меток
+    present = (support + predicted) > 0
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "support": support.astype(np.int64),
+        "accuracy": tp.sum() / total if total else 0.0,
+        "macro_f1": f1[present].mean() if present.any() else 0.0,
+    }
+
+
+def format_report(matrix):
+    metrics = metrics_from_confusion(matrix)
+    width = max(len(name) for name in LABEL_NAMES) + 2
+    lines = [f"{'':>{width}} precision    recall  f1-score   support", ""]
+    for i, name in enumerate(LABEL_NAMES):
+        lines.append(
+            f"{name:>{width}} {metrics['precision'][i]:9.4f}"
+            f" {metrics['recall'][i]:9.4f} {metrics['f1'][i]:9.4f}"
+            f" {metrics['support'][i]:9d}"
+        )
+    total = int(metrics["support"].sum())
+    lines.append("")
+    lines.append(f"{'accuracy':>{width}} {'':19} {metrics['accuracy']:9.4f} {total:9d}")
+    lines.append(f"{'macro f1':>{width}} {'':19} {metrics['macro_f1']:9.4f} {total:9d}")
+    return "\n".join(lines)
+
+
+class Checkpoint:
+    """Прогресс оценки рядом с файлом предсказаний.
+
+    Сохраняется после каждого чанка, когда его строки уже записаны на диск:
+    число обработанных строк, размер файла предсказаний и матрица ошибок.
+    """
 
-    return predictions
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self.rows = 0
+        self.output_bytes = 0
+        self.tokens = 0
+        self.seconds = 0.0
+        self.confusion = np.zeros((len(LABEL_NAMES), len(LABEL_NAMES)), dtype=np.int64)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") != self.source:
+            print("Checkpoint belongs to another model or test file, starting over")
+            return False
+        self.rows = state["rows"]
+        self.output_bytes = state["output_bytes"]
+        self.tokens = state["tokens"]
+        self.seconds = state["seconds"]
+        self.confusion = np.array(state["confusion"], dtype=np.int64)
+        return True
+
+    def save(self):
+        state = {
+            "source": self.source,
+            "rows": self.rows,
+            "output_bytes": self.output_bytes,
+            "tokens": self.tokens,
+            "seconds": self.seconds,
+            "confusion": self.confusion.tolist(),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
 
 
 def main(args):
@@ -33,46 +141,101 @@ def main(args):
     model = AutoModelForSequenceClassification.from_pretrained(args.model_path)
     model.to(device)
 
-    df = pd.read_csv(args.test_path)
-    texts = df["text"].fillna("").tolist()
+    output_path = args.output or args.test_path.replace(".csv", "_predictions.csv")
+    stat = os.stat(args.test_path)
+    source = {
+        "model_path": os.path.abspath(args.model_path),
+        "test_path": os.path.abspath(args.test_path),
+        "test_size": stat.st_size,
+        "test_mtime": stat.st_mtime,
+    }
+    checkpoint = Checkpoint(output_path + ".checkpoint.json", source)
+    resumed = not args.restart and checkpoint.load() and os.path.exists(output_path)
+
+    if resumed:
+        print(f"Resuming after {checkpoint.rows:,} rows")
+        output = open(output_path, "r+b")
+        # Строки, записанные после последнего чекпоинта, будут пересчитаны
+        output.truncate(checkpoint.output_bytes)
+        output.seek(checkpoint.output_bytes)
+    else:
+        checkpoint = Checkpoint(checkpoint.path, source)
+        output = open(output_path, "wb")
+
+    done = checkpoint.rows
+    reader = pd.read_csv(
+        args.test_path,
+        chunksize=args.chunk_size,
+        skiprows=lambda i: 0 < i <= done,
+    )
+    has_labels = False
 
     print("Generating predictions...")
-    predictions = predict_batch(texts, model, tokenizer, device)
-    df["predicted_label"] = predictions
+    try:
+        for chunk in reader:
+            started = time.perf_counter()
+            texts = chunk["text"].fillna("").astype(str).tolist()
+            predictions, tokens = predict_batch(
+                texts, model, tokenizer, device, args.batch_size, args.max_length
+            )
+            chunk["predicted_label"] = predictions
+
+            if "label" in chunk.columns:
+                has_labels = True
+                labeled = chunk["label"].notna().to_numpy()
+                y_true = chunk["label"].to_numpy()[labeled].astype(np.int64)
+                update_confusion(checkpoint.confusion, y_true, predictions[labeled])
+
+            header = checkpoint.output_bytes == 0
+            output.write(chunk.to_csv(index=False, header=header).encode("utf-8"))
+            output.flush()
+            os.fsync(output.fileno())
 
-    if "label" in df.columns:
-        y_true = df["label"].astype(int).tolist()
-        y_pred = predictions
+            checkpoint.rows += len(chunk)
+            checkpoint.output_bytes = output.tell()
+            checkpoint.tokens += tokens
+            checkpoint.seconds += time.perf_counter() - started
+            checkpoint.save()
 
-        macro_f1 = f1_score(y_true, y_pred, average="macro")
+            seconds = max(checkpoint.seconds, 1e-9)
+            print(
+                f"Processed: {checkpoint.rows:,} rows, "
+                f"{checkpoint.rows / seconds:,.0f} rows/sec, "
+                f"{checkpoint.tokens / seconds:,.0f} tokens/sec",
+                end="\r",
+            )
+    finally:
+        output.close()
+    print()
+
+    seconds = max(checkpoint.seconds, 1e-9)
+    throughput = (
+        f"Rows: {checkpoint.rows:,}, time: {checkpoint.seconds:.1f} sec, "
+        f"{checkpoint.rows / seconds:,.0f} rows/sec, "
+        f"{checkpoint.tokens / seconds:,.0f} tokens/sec"
+    )
+    print(throughput)
+
+    if has_labels or checkpoint.confusion.any():
+        macro_f1 = metrics_from_confusion(checkpoint.confusion)["macro_f1"]
+        report = format_report(checkpoint.confusion)
         print(f"\n{'='*50}")
         print(f"MACRO F1 SCORE: {macro_f1:.4f}")
         print(f"{'='*50}\n")
 
         print("Classification Report:")
-        print(
-            classification_report(
-                y_true, y_pred, target_names=["Негативный", "Нейтральный", "Позитивный"]
-            )
-        )
+        print(report)
 
         print("\nConfusion Matrix:")
-        print(confusion_matrix(y_true, y_pred))
+        print(checkpoint.confusion)
 
         with open(args.output_report, "w", encoding="utf-8") as f:
             f.write(f"Macro F1 Score: {macro_f1:.4f}\n\n")
             f.write("Classification Report:\n")
-            f.write(
-                classification_report(
-                    y_true,
-                    y_pred,
-                    target_names=["Негативный", "Нейтральный", "Позитивный"],
-                )
-            )
-            f.write(f"\nConfusion Matrix:\n{confusion_matrix(y_true, y_pred)}")
+            f.write(report)
+            f.write(f"\n\nConfusion Matrix:\n{checkpoint.confusion}\n")
+            f.write(f"\n{throughput}\n")
 
-    output_path = args.test_path.replace(".csv", "_predictions.csv")
-    df.to_csv(output_path, index=False)
     print(f"\nPredictions saved to: {output_path}")
 
 
@@ -81,5 +244,14 @@ if __name__ == "__main__":
     parser.add_argument("--model_path", type=str, required=True)
     parser.add_argument("--test_path", type=str, required=True)
     parser.add_argument("--output_report", type=str, default="metrics_report.txt")
+    parser.add_argument(
+        "--output", type=str, default=None, help="По умолчанию *_predictions.csv"
+    )
+    parser.add_argument("--chunk_size", type=int, default=10000)
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--max_length", type=int, default=256)
+    parser.add_argument(
+        "--restart", action="store_true", help="Игнорировать чекпоинт и начать заново"
+    )
     args = parser.parse_args()
     main(args)
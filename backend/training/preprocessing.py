@@ -1,35 +1,35 @@
 import re
-from typing import List
+from typing import Iterable, List
+
+import pandas as pd
+
+HTML_RE = re.compile(r'<[^>]+>')
+URL_RE = re.compile(r'https?://\S+|www\.\S+')
+# Диапазоны эмодзи целиком лежат вне разрешённых символов, поэтому отдельного
+# прохода для них нет. Исключение — U+3000 (идеографический пробел): он входит
+# в диапазон эмодзи и удаляется, а не превращается в пробел.
+DISALLOWED_RE = re.compile(r'[^а-яёa-z0-9\s.,!?\-]+|\u3000')
+REPEATED_PUNCT_RE = re.compile(r'([!?.,])\1+')
+MIN_LENGTH = 3
 
 
 def preprocess_text(text: str) -> str:
     if not text or not isinstance(text, str):
-        return ""
-    
-    text = text.lower()
-    text = re.sub(r'<[^>]+>', '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F1E0-\U0001F1FF"
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "]+",
-        flags=re.UNICODE
-    )
-    text = emoji_pattern.sub('', text)
-    text = re.sub(r'[^а-яёa-z0-9\s.,!?\-]', '', text)
-    text = re.sub(r'([!?.,])\1+', r'\1', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-    if len(text) < 3:
-        return ""
-    
-    return text
-
-
-def preprocess_batch(texts: List[str]) -> List[str]:
+        return ''
+    text = HTML_RE.sub('', text.lower())
+    text = URL_RE.sub('', text)
+    text = DISALLOWED_RE.sub('', text)
+    text = REPEATED_PUNCT_RE.sub(r'\1', text)
+    # split() режет по тем же пробельным символам, что и \s
+    text = ' '.join(text.split())
+    return text if len(text) >= MIN_LENGTH else ''
+
+
+def preprocess_batch(texts: Iterable) -> List[str]:
+    """preprocess_text для каждого элемента списка, массива или колонки pandas"""
     return [preprocess_text(t) for t in texts]
+
+
+def preprocess_series(texts: pd.Series) -> pd.Series:
+    cleaned = preprocess_batch(texts.tolist())
+    return pd.Series(cleaned, index=texts.index, dtype=object)
@@ -1,82 +1,199 @@
 import argparse
+import os
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-from preprocessing import preprocess_text, preprocess_batch
+import pyarrow as pa
+import pyarrow.parquet as pq
+from preprocessing import preprocess_series
+
+
+def clean_chunk(chunk, text_column, output_format, header):
+    """Очищает чанк и сразу сериализует его, чтобы основной процесс только писал"""
+    start = time.perf_counter()
+    chunk["text_cleaned"] = preprocess_series(chunk[text_column])
+    chunk["is_empty"] = chunk["text_cleaned"] == ""
+    clean_time = time.perf_counter() - start
+
+    if output_format == "parquet":
+        payload = pa.Table.from_pandas(chunk, preserve_index=False)
+        # pandas читает колонку из одних пропусков как float64; null-тип
+        # приводится к схеме файла, какой бы она ни была
+        for i, column in enumerate(payload.columns):
+            if column.null_count == len(column) and len(column):
+                payload = payload.set_column(
+                    i, payload.field(i).name, pa.nulls(len(column))
+                )
+    else:
+        payload = chunk.to_csv(index=False, header=header)
+    sample = chunk[[text_column, "text_cleaned"]].head(10) if header else None
+    return payload, len(chunk), int(chunk["is_empty"].sum()), clean_time, sample
+
+
+class ParquetSink:
+    """Дописывает чанки в один Parquet-файл; схема берётся из первого чанка"""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, table):
+        if self.writer is None:
+            # Колонка из одних пропусков в первом чанке иначе навсегда станет null
+            schema = pa.schema(
+                pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                for f in table.schema
+            )
+            self.writer = pq.ParquetWriter(self.path, schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
 
 
-def process_file(input_path, output_path=None, text_column="text", chunk_size=10000):
+class _Done:
+    """Готовый результат с интерфейсом Future для запуска без пула"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+
+    def write(self, payload):
+        self.file.write(payload)
+
+    def close(self):
+        self.file.close()
+
+
+def process_file(
+    input_path,
+    output_path=None,
+    text_column="text",
+    chunk_size=10000,
+    workers=None,
+):
     print(f"Загрузка файла: {input_path}")
     start_time = time.time()
-    
-    total_rows = sum(1 for _ in open(input_path, encoding="utf-8")) - 1
-    print(f"Всего строк: {total_rows:,}")
-    
-    processed_chunks = []
+
+    columns = pd.read_csv(input_path, nrows=0).columns
+    if text_column not in columns:
+        raise ValueError(f"Колонка '{text_column}' не найдена. Доступные: {list(columns)}")
+
+    workers = workers or os.cpu_count() or 1
+    output_format = "parquet" if output_path and output_path.endswith(".parquet") else "csv"
+    total_bytes = os.path.getsize(input_path)
+    print(f"Размер: {total_bytes / 1024**2:,.1f} МБ, процессов: {workers}")
+
+    sink = None
+    if output_path:
+        sink = ParquetSink(output_path) if output_format == "parquet" else CsvSink(output_path)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    # Ограничиваем число чанков в полёте: память не растёт с размером файла
+    pending = deque()
+    max_pending = workers * 2
+
     processed_count = 0
     empty_count = 0
-    
-    for chunk in pd.read_csv(input_path, chunksize=chunk_size):
-        if text_column not in chunk.columns:
-            raise ValueError(f"Колонка '{text_column}' не найдена. Доступные: {list(chunk.columns)}")
-        
-        texts = chunk[text_column].fillna("").tolist()
-        cleaned = preprocess_batch(texts)
-        
-        chunk["text_cleaned"] = cleaned
-        chunk["is_empty"] = [t == "" for t in cleaned]
-        
-        empty_count += sum(chunk["is_empty"])
-        processed_count += len(chunk)
-        
-        progress = (processed_count / total_rows) * 100
-        print(f"Обработано: {processed_count:,}/{total_rows:,} ({progress:.1f}%)", end="\r")
-        
-        processed_chunks.append(chunk)
-    
+    clean_time = 0.0
+    sample = None
+
+    def collect():
+        nonlocal processed_count, empty_count, clean_time, sample
+        payload, rows, empty, seconds, chunk_sample = pending.popleft().result()
+        if sink is not None:
+            sink.write(payload)
+        processed_count += rows
+        empty_count += empty
+        clean_time += seconds
+        if chunk_sample is not None:
+            sample = chunk_sample
+
+        progress = bytes_read / max(total_bytes, 1) * 100
+        speed = processed_count / max(time.time() - start_time, 1e-9)
+        print(
+            f"Обработано: {processed_count:,} ({progress:.1f}%), {speed:,.0f} строк/сек",
+            end="\r",
+        )
+
+    try:
+        with open(input_path, "rb") as f:
+            reader = pd.read_csv(f, chunksize=chunk_size, dtype={text_column: str})
+            for index, chunk in enumerate(reader):
+                bytes_read = f.tell()
+                args = (chunk, text_column, output_format, index == 0)
+                if pool is not None:
+                    pending.append(pool.submit(clean_chunk, *args))
+                else:
+                    pending.append(_Done(clean_chunk(*args)))
+                while len(pending) >= max_pending:
+                    collect()
+            bytes_read = total_bytes
+            while pending:
+                collect()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if sink is not None:
+            sink.close()
+
     print()
-    
-    result = pd.concat(processed_chunks, ignore_index=True)
-    
+
+    total_rows = max(processed_count, 1)
     elapsed = time.time() - start_time
-    speed = total_rows / elapsed
-    
+    speed = processed_count / elapsed
+
     print(f"\n{'='*50}")
     print(f"РЕЗУЛЬТАТЫ ПРЕДОБРАБОТКИ")
     print(f"{'='*50}")
-    print(f"Обработано строк: {total_rows:,}")
+    print(f"Обработано строк: {processed_count:,}")
     print(f"Пустых после очистки: {empty_count:,} ({empty_count/total_rows*100:.1f}%)")
     print(f"Время: {elapsed:.2f} сек")
     print(f"Скорость: {speed:,.0f} строк/сек")
-    
-    print(f"\n{'='*50}")
-    print("ПРИМЕРЫ ПРЕОБРАЗОВАНИЙ")
-    print(f"{'='*50}")
-    sample = result.head(10)
-    for _, row in sample.iterrows():
-        original = str(row[text_column])[:50]
-        cleaned = str(row["text_cleaned"])[:50]
-        print(f"'{original}' -> '{cleaned}'")
-    
+    clean_speed = processed_count / max(clean_time, 1e-9)
+    print(f"Скорость очистки: {clean_speed:,.0f} строк/сек на процесс")
+
+    if sample is not None:
+        print(f"\n{'='*50}")
+        print("ПРИМЕРЫ ПРЕОБРАЗОВАНИЙ")
+        print(f"{'='*50}")
+        for original, cleaned in zip(sample[text_column], sample["text_cleaned"]):
+            print(f"'{str(original)[:50]}' -> '{str(cleaned)[:50]}'")
+
     if output_path:
-        result.to_csv(output_path, index=False)
         print(f"\nРезультат сохранён: {output_path}")
-    
-    return result
+
+    return {
+        "rows": processed_count,
+        "empty": empty_count,
+        "seconds": elapsed,
+        "rows_per_sec": speed,
+    }
 
 
 def main():
     parser = argparse.ArgumentParser(description="Предобработка текстов из CSV файла")
     parser.add_argument("--input", "-i", type=str, required=True, help="Путь к входному CSV файлу")
-    parser.add_argument("--output", "-o", type=str, default=None, help="Путь для сохранения результата")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Путь для сохранения результата (.csv или .parquet)")
     parser.add_argument("--column", "-c", type=str, default="text", help="Название колонки с текстом")
     parser.add_argument("--chunk", type=int, default=10000, help="Размер чанка для обработки")
-    
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Число процессов (по умолчанию все ядра)")
+
     args = parser.parse_args()
-    
+
     if not args.output:
         args.output = args.input.replace(".csv", "_preprocessed.csv")
-    
-    process_file(args.input, args.output, args.column, args.chunk)
+
+    process_file(args.input, args.output, args.column, args.chunk, args.workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from evaluate import metrics_from_confusion, predict_batch, update_confusion
+
+
+class WordTokenizer:
+    """Токенизатор-заглушка: один токен на слово"""
+
+    def __call__(self, texts, truncation, max_length, **kwargs):
+        return {"input_ids": [[1] * min(len(t.split()), max_length) for t in texts]}
+
+    def pad(self, features, return_tensors):
+        ids = features["input_ids"]
+        width = max(len(row) for row in ids)
+        mask = [[1] * len(row) + [0] * (width - len(row)) for row in ids]
+        return {"attention_mask": torch.tensor(mask)}
+
+
+class LengthModel(torch.nn.Module):
+    """Предсказывает класс длина % 3"""
+
+    def forward(self, attention_mask):
+        classes = attention_mask.sum(dim=1) % 3
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(classes, 3).float())
+
+
+class TestPredictBatch(unittest.TestCase):
+
+    def test_predictions_keep_input_order(self):
+        rng = np.random.default_rng(0)
+        lengths = rng.integers(1, 40, size=200)
+        texts = [" ".join(["слово"] * n) for n in lengths]
+        predictions, tokens = predict_batch(
+            texts, LengthModel(), WordTokenizer(), "cpu", batch_size=7, max_length=30
+        )
+        expected = np.minimum(lengths, 30) % 3
+        np.testing.assert_array_equal(predictions, expected)
+        self.assertEqual(tokens, int(np.minimum(lengths, 30).sum()))
+
+
+class TestConfusionMetrics(unittest.TestCase):
+
+    def test_matches_sklearn_on_chunks(self):
+        rng = np.random.default_rng(1)
+        y_true = rng.integers(0, 3, size=1000)
+        y_pred = np.where(rng.random(1000) < 0.7, y_true, rng.integers(0, 3, size=1000))
+
+        matrix = np.zeros((3, 3), dtype=np.int64)
+        for start in range(0, 1000, 128):
+            end = start + 128
+            update_confusion(matrix, y_true[start:end], y_pred[start:end])
+        metrics = metrics_from_confusion(matrix)
+
+        macro_f1 = f1_score(y_true, y_pred, average="macro")
+        self.assertAlmostEqual(metrics["macro_f1"], macro_f1)
+        self.assertAlmostEqual(metrics["accuracy"], accuracy_score(y_true, y_pred))
+        np.testing.assert_allclose(
+            metrics["precision"], precision_score(y_true, y_pred, average=None)
+        )
+        np.testing.assert_allclose(
+            metrics["recall"], recall_score(y_true, y_pred, average=None)
+        )
+        self.assertEqual(metrics["support"].tolist(), np.bincount(y_true).tolist())
+
+    def test_missing_class_scores_zero(self):
+        matrix = np.array([[5, 0, 0], [0, 5, 0], [0, 0, 0]])
+        metrics = metrics_from_confusion(matrix)
+        self.assertEqual(metrics["f1"].tolist(), [1.0, 1.0, 0.0])
+
+    def test_macro_f1_skips_absent_class(self):
+        y_true = np.array([0, 0, 0, 1, 1, 1, 1])
+        y_pred = np.array([0, 1, 0, 1, 1, 0, 1])
+        matrix = np.zeros((3, 3), dtype=np.int64)
+        update_confusion(matrix, y_true, y_pred)
+        metrics = metrics_from_confusion(matrix)
+        self.assertAlmostEqual(
+            metrics["macro_f1"], f1_score(y_true, y_pred, average="macro")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
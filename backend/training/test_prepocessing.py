@@ -1,5 +1,8 @@
 import unittest
-from preprocessing import preprocess_text, preprocess_batch
+
+import pandas as pd
+
+from preprocessing import preprocess_text, preprocess_batch, preprocess_series
 
 
 class TestPreprocessText(unittest.TestCase):
@@ -155,5 +158,35 @@ class TestComplexCases(unittest.TestCase):
         self.assertEqual(preprocess_text(text), expected)
 
 
+class TestBatchMatchesSingle(unittest.TestCase):
+
+    CASES = [
+        "  <b>СУПЕР</b> товар!!! 🔥 https://shop.ru Рекомендую!!!  ",
+        "Сайт https://x.ru<a href=1>хвост",
+        "a < b и c > d",
+        "Пробел\u3000идеографический",
+        "Узкий\u2009пробел\xa0и\x85перенос",
+        "Нулевой\x00символ <b\x00>внутри",
+        "Что!!!???...,,,",
+        None,
+        42,
+        "",
+    ]
+
+    def test_batch_equals_single(self):
+        expected = [preprocess_text(t) for t in self.CASES]
+        self.assertEqual(preprocess_batch(self.CASES), expected)
+
+    def test_batch_single_item(self):
+        for text in self.CASES:
+            self.assertEqual(preprocess_batch([text]), [preprocess_text(text)])
+
+    def test_series_keeps_index(self):
+        texts = pd.Series(["ПРИВЕТ", None, "Мир!!!"], index=[10, 20, 30])
+        result = preprocess_series(texts)
+        self.assertEqual(list(result.index), [10, 20, 30])
+        self.assertEqual(result.tolist(), ["привет", "", "мир!"])
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
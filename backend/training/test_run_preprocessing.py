@@ -0,0 +1,116 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import run_preprocessing
+from preprocessing import preprocess_text
+from run_preprocessing import ParquetSink, process_file
+
+
+class TestProcessFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write_csv(self, df):
+        path = self.path("input.csv")
+        df.to_csv(path, index=False)
+        return path
+
+    def run_quietly(self, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return process_file(*args, **kwargs)
+
+    def test_order_preserved_with_workers(self):
+        texts = [f"<b>Отзыв {i}</b> https://shop.ru/{i}" for i in range(500)]
+        source = self.write_csv(pd.DataFrame({"id": range(500), "text": texts}))
+        output = self.path("output.csv")
+        self.run_quietly(source, output, chunk_size=7, workers=2)
+
+        result = pd.read_csv(output, keep_default_na=False)
+        self.assertEqual(result["id"].tolist(), list(range(500)))
+        self.assertEqual(
+            result["text_cleaned"].tolist(), [preprocess_text(t) for t in texts]
+        )
+
+    def test_inline_run_without_pool(self):
+        source = self.write_csv(pd.DataFrame({"text": ["Привет", "<br/>", "Мир"]}))
+        output = self.path("output.csv")
+        with mock.patch.object(run_preprocessing, "ProcessPoolExecutor") as pool:
+            stats = self.run_quietly(source, output, chunk_size=2, workers=1)
+        pool.assert_not_called()
+
+        result = pd.read_csv(output, keep_default_na=False)
+        self.assertEqual(result["text_cleaned"].tolist(), ["привет", "", "мир"])
+        self.assertEqual(result["is_empty"].tolist(), [False, True, False])
+        self.assertEqual((stats["rows"], stats["empty"]), (3, 1))
+
+    def test_stats(self):
+        texts = ["хорошо", "", "<p></p>", "плохо", "https://x.ru", "норм"]
+        source = self.write_csv(pd.DataFrame({"text": texts}))
+        stats = self.run_quietly(source, chunk_size=4, workers=1)
+
+        self.assertEqual(set(stats), {"rows", "empty", "seconds", "rows_per_sec"})
+        self.assertEqual(stats["rows"], 6)
+        self.assertEqual(stats["empty"], 3)
+        self.assertGreater(stats["seconds"], 0)
+        self.assertAlmostEqual(
+            stats["rows_per_sec"], stats["rows"] / stats["seconds"]
+        )
+
+    def test_missing_column(self):
+        source = self.write_csv(pd.DataFrame({"review": ["a"]}))
+        with self.assertRaises(ValueError):
+            self.run_quietly(source, workers=1)
+
+    def test_parquet_schema_stable_across_chunks(self):
+        df = pd.DataFrame(
+            {
+                "text": ["первый", "второй", "третий", "четвёртый", "пятый"],
+                # В первом чанке только пропуски, дальше строки
+                "note": [None, None, "a", "b", None],
+                # Во втором чанке только пропуски
+                "rating": [5, 4, None, None, 3],
+            }
+        )
+        source = self.write_csv(df)
+        output = self.path("output.parquet")
+        self.run_quietly(source, output, chunk_size=2, workers=2)
+
+        parquet = pq.ParquetFile(output)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.schema_arrow.field("note").type, pa.string())
+        result = parquet.read().to_pandas()
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result["note"].tolist()[2:4], ["a", "b"])
+        self.assertTrue(result["rating"].iloc[2:4].isna().all())
+        self.assertEqual(result["text_cleaned"].tolist()[0], "первый")
+
+
+class TestParquetSink(unittest.TestCase):
+
+    def test_null_column_in_first_chunk_becomes_string(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.parquet")
+            sink = ParquetSink(path)
+            sink.write(pa.table({"x": pa.array([None, None], pa.null())}))
+            sink.write(pa.table({"x": pa.array(["a", None])}))
+            sink.close()
+            table = pq.read_table(path)
+        self.assertEqual(table.schema.field("x").type, pa.string())
+        self.assertEqual(table.column("x").to_pylist(), [None, None, "a", None])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
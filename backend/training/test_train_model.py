@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertForSequenceClassification, Trainer
+
+from train_model import SentimentDataset, tokenize_cached, training_arguments
+
+
+class WordTokenizer:
+    """Токенизатор-заглушка: id слова — его длина"""
+
+    name_or_path = "words"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __len__(self):
+        return 100
+
+    def __call__(self, texts, truncation, max_length, **kwargs):
+        self.calls += 1
+        return {"input_ids": [[len(w) for w in t.split()][:max_length] for t in texts]}
+
+
+class TestTokenizeCached(unittest.TestCase):
+
+    def test_second_run_reads_cache(self):
+        tokenizer = WordTokenizer()
+        texts = ["очень хороший товар", "плохо", "a b c d e f"]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ids, offsets = tokenize_cached(texts, tokenizer, 4, cache_dir)
+            cached_ids, cached_offsets = tokenize_cached(texts, tokenizer, 4, cache_dir)
+            self.assertEqual(tokenizer.calls, 1)
+            np.testing.assert_array_equal(ids, cached_ids)
+            np.testing.assert_array_equal(offsets, cached_offsets)
+            self.assertEqual(offsets.tolist(), [0, 3, 4, 8])
+
+            tokenize_cached(texts, tokenizer, 8, cache_dir)
+            self.assertEqual(tokenizer.calls, 2)
+
+    def test_cache_written_by_another_run(self):
+        tokenizer = WordTokenizer()
+        texts = ["раз два три", "четыре"]
+        real_replace = os.replace
+
+        def racing_replace(src, dst):
+            # Параллельный запуск успевает положить тот же кэш первым
+            shutil.copytree(src, dst)
+            real_replace(src, dst)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch("train_model.os.replace", side_effect=racing_replace):
+                ids, offsets = tokenize_cached(texts, tokenizer, 8, cache_dir)
+            self.assertEqual(ids.tolist(), [3, 3, 3, 6])
+            self.assertEqual(offsets.tolist(), [0, 3, 4])
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            tokenize_cached(texts, tokenizer, 8, cache_dir)
+            self.assertEqual(tokenizer.calls, 1)
+
+    def test_dataset_items_are_unpadded(self):
+        dataset = SentimentDataset(["раз два", "три"], [2, 0], WordTokenizer())
+        self.assertEqual(dataset[0], {"input_ids": [3, 3], "labels": 2})
+        self.assertEqual(dataset[1], {"input_ids": [3], "labels": 0})
+
+    def test_sorted_dataset(self):
+        dataset = SentimentDataset(
+            ["a b c", "a", "a b"], [0, 1, 2], WordTokenizer(), sort_by_length=True
+        )
+        self.assertEqual([dataset[i]["labels"] for i in range(3)], [1, 2, 0])
+
+
+def pad(features):
+    width = max(len(f["input_ids"]) for f in features)
+    return {
+        "input_ids": torch.tensor(
+            [f["input_ids"] + [0] * (width - len(f["input_ids"])) for f in features]
+        ),
+        "labels": torch.tensor([f["labels"] for f in features]),
+    }
+
+
+class TestLengthGroupedBatches(unittest.TestCase):
+
+    def test_trainer_groups_similar_lengths(self):
+        rng = np.random.default_rng(0)
+        lengths = rng.integers(1, 128, size=2048)
+        texts = [" ".join(["a"] * n) for n in lengths]
+        # Метка — номер примера, чтобы проверить, что каждый попал в эпоху
+        dataset = SentimentDataset(texts, np.arange(2048), WordTokenizer(), 128)
+        config = BertConfig(
+            vocab_size=100,
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=1,
+            intermediate_size=8,
+        )
+        with tempfile.TemporaryDirectory() as output_dir:
+            args = SimpleNamespace(output_dir=output_dir, epochs=1, batch_size=32)
+            trainer = Trainer(
+                model=BertForSequenceClassification(config),
+                args=training_arguments(args),
+                train_dataset=dataset,
+                eval_dataset=dataset,
+                data_collator=pad,
+            )
+            batches = list(trainer.get_train_dataloader())
+        seen = sorted(i for batch in batches for i in batch["labels"].tolist())
+        self.assertEqual(seen, list(range(2048)))
+        padded = sum(batch["input_ids"].numel() for batch in batches)
+        self.assertLess(padded, lengths.sum() * 1.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,7 @@
 import argparse
+import hashlib
+import os
+import shutil
 
 import numpy as np
 import pandas as pd
@@ -9,31 +12,111 @@ from torch.utils.data import Dataset
 from transformers import (
     AutoModelForSequenceClassification,
     AutoTokenizer,
+    DataCollatorWithPadding,
     EarlyStoppingCallback,
     Trainer,
     TrainingArguments,
 )
 
+TOKENIZE_CHUNK = 10_000
 
-class SentimentDataset(Dataset):
-    def __init__(self, texts, labels, tokenizer, max_length=256):
-        self.encodings = tokenizer(
-            texts,
+# Обучающие батчи собирает встроенный LengthGroupedSampler: мегабатчи по 50
+# батчей сортируются по длине. В transformers 5 он включается через
+# train_sampling_strategy, в 4.x — флагом group_by_length.
+if "train_sampling_strategy" in TrainingArguments.__dataclass_fields__:
+    GROUP_BY_LENGTH = {"train_sampling_strategy": "group_by_length"}
+else:
+    GROUP_BY_LENGTH = {"group_by_length": True}
+
+
+def tokenize_cached(texts, tokenizer, max_length, cache_dir=None):
+    """Токенизирует тексты без паддинга в плоский массив id и смещения.
+
+    Результат сохраняется в cache_dir под ключом из токенизатора, max_length
+    и хэша текстов, а повторные запуски открывают его через mmap.
+    """
+    digest = hashlib.sha1(
+        f"{tokenizer.name_or_path}|{type(tokenizer).__name__}|{len(tokenizer)}|"
+        f"{max_length}".encode()
+    )
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x00")
+    path = os.path.join(cache_dir, digest.hexdigest()) if cache_dir else None
+
+    if path and os.path.exists(os.path.join(path, "offsets.npy")):
+        return _load_tokens(path)
+
+    parts, lengths = [], []
+    for start in range(0, len(texts), TOKENIZE_CHUNK):
+        encoded = tokenizer(
+            texts[start : start + TOKENIZE_CHUNK],
             truncation=True,
-            padding=True,
             max_length=max_length,
-            return_tensors="pt",
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )["input_ids"]
+        lengths.extend(len(ids) for ids in encoded)
+        parts.append(np.fromiter((t for ids in encoded for t in ids), dtype=np.int32))
+    ids = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+    if path:
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, "ids.npy"), ids)
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Тот же кэш успел записать параллельный запуск
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.exists(os.path.join(path, "offsets.npy")):
+                raise
+            return _load_tokens(path)
+    return ids, offsets
+
+
+def _load_tokens(path):
+    ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+    offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+    return ids, offsets
+
+
+class SentimentDataset(Dataset):
+    """Токены без паддинга; батчи добиваются до своей максимальной длины
+    в DataCollatorWithPadding"""
+
+    def __init__(
+        self,
+        texts,
+        labels,
+        tokenizer,
+        max_length=256,
+        cache_dir=None,
+        sort_by_length=False,
+    ):
+        self.ids, self.offsets = tokenize_cached(
+            texts, tokenizer, max_length, cache_dir
         )
-        self.labels = torch.tensor(labels, dtype=torch.long)
+        self.lengths = np.diff(self.offsets)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.order = np.arange(len(self.labels))
+        if sort_by_length:
+            # Для валидации порядок не важен, а соседние по длине тексты
+            # почти не требуют паддинга
+            self.order = np.argsort(self.lengths, kind="stable")
+            self.lengths = self.lengths[self.order]
 
     def __len__(self):
         return len(self.labels)
 
     def __getitem__(self, idx):
+        row = self.order[idx]
+        start, end = self.offsets[row], self.offsets[row + 1]
         return {
-            "input_ids": self.encodings["input_ids"][idx],
-            "attention_mask": self.encodings["attention_mask"][idx],
-            "labels": self.labels[idx],
+            "input_ids": self.ids[start:end].tolist(),
+            "labels": int(self.labels[row]),
         }
 
 
@@ -46,6 +129,25 @@ def compute_metrics(eval_pred):
     }
 
 
+def training_arguments(args):
+    return TrainingArguments(
+        output_dir=args.output_dir,
+        num_train_epochs=args.epochs,
+        per_device_train_batch_size=args.batch_size,
+        per_device_eval_batch_size=args.batch_size,
+        warmup_steps=500,
+        weight_decay=0.01,
+        logging_steps=100,
+        eval_strategy="epoch",
+        save_strategy="epoch",
+        load_best_model_at_end=True,
+        metric_for_best_model="macro_f1",
+        greater_is_better=True,
+        fp16=torch.cuda.is_available(),
+        **GROUP_BY_LENGTH,
+    )
+
+
 def main(args):
     df = pd.read_csv(args.data_path)
     df = df.dropna(subset=["text", "label"])
@@ -60,31 +162,27 @@ def main(args):
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModelForSequenceClassification.from_pretrained(model_name, num_labels=3)
 
-    train_dataset = SentimentDataset(train_texts, train_labels, tokenizer)
-    val_dataset = SentimentDataset(val_texts, val_labels, tokenizer)
-
-    training_args = TrainingArguments(
-        output_dir=args.output_dir,
-        num_train_epochs=args.epochs,
-        per_device_train_batch_size=args.batch_size,
-        per_device_eval_batch_size=args.batch_size,
-        warmup_steps=500,
-        weight_decay=0.01,
-        logging_dir="./logs",
-        logging_steps=100,
-        evaluation_strategy="epoch",
-        save_strategy="epoch",
-        load_best_model_at_end=True,
-        metric_for_best_model="macro_f1",
-        greater_is_better=True,
-        fp16=torch.cuda.is_available(),
+    train_dataset = SentimentDataset(
+        train_texts, train_labels, tokenizer, args.max_length, args.cache_dir
+    )
+    val_dataset = SentimentDataset(
+        val_texts,
+        val_labels,
+        tokenizer,
+        args.max_length,
+        args.cache_dir,
+        sort_by_length=True,
+    )
+    collator = DataCollatorWithPadding(
+        tokenizer, pad_to_multiple_of=8 if torch.cuda.is_available() else None
     )
 
     trainer = Trainer(
         model=model,
-        args=training_args,
+        args=training_arguments(args),
         train_dataset=train_dataset,
         eval_dataset=val_dataset,
+        data_collator=collator,
         compute_metrics=compute_metrics,
         callbacks=[EarlyStoppingCallback(early_stopping_patience=3)],
     )
@@ -106,5 +204,12 @@ if __name__ == "__main__":
     parser.add_argument("--model_name", type=str, default="cointegrated/rubert-tiny2")
     parser.add_argument("--epochs", type=int, default=5)
     parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--max_length", type=int, default=256)
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default="./tokenized_cache",
+        help="Кэш токенизации между запусками, пустая строка отключает",
+    )
     args = parser.parse_args()
     main(args)
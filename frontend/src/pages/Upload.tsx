@@ -5,7 +5,7 @@ import { Upload as UploadIcon, FileText, X } from "lucide-react";
 import { useNavigate } from "react-router-dom";
 import { useToast } from "@/hooks/use-toast";
 import { Progress } from "@/components/ui/progress";
-import { uploadFile, getResults } from "@/services/api";
+import { uploadFile, getResults, subscribeToTask } from "@/services/api";
 import { useStore } from "@/store/useStore";
 
 const Upload = () => {
@@ -56,25 +56,44 @@ const Upload = () => {
       setTaskId(task_id);
       toast({ title: "Анализ запущен", description: "Обработка данных..." });
 
-      const poll = async () => {
+      subscribeToTask(task_id, async (event) => {
+        if (event.status === 'processing') {
+          setProgress({ current: event.progress || 0, total: event.total || 0 });
+          return;
+        }
+        if (event.status !== 'completed') {
+          setLoading(false);
+          toast({
+            title: "Анализ не завершён",
+            description: event.error || "Задача отменена или результаты удалены",
+            variant: "destructive",
+          });
+          return;
+        }
         try {
           const result = await getResults(task_id);
-          if (result.status === 'processing') {
-            setProgress({ current: result.progress || 0, total: result.total || 0 });
-            setTimeout(poll, 1000);
-          } else {
-            setResults(result.data || null);
-            setStats(result.stats || null);
-            setLoading(false);
-            toast({ title: "Анализ завершён", description: "Результаты готовы к просмотру" });
-            navigate("/results");
-          }
+          setResults(result.data || null);
+          setStats(result.stats || null);
+          toast({ title: "Анализ завершён", description: "Результаты готовы к просмотру" });
+          navigate("/results");
         } catch (err) {
           console.error(err);
-          setTimeout(poll, 2000);
+          toast({
+            title: "Ошибка",
+            description: "Не удалось загрузить результаты",
+            variant: "destructive",
+          });
+        } finally {
+          setLoading(false);
         }
-      };
-      poll();
+      }, () => {
+        setLoading(false);
+        toast({
+          title: "Соединение прервано",
+          description: "Не удалось получить статус анализа",
+          variant: "destructive",
+        });
+      });
     } catch (err: any) {
       toast({
         title: "Ошибка загрузки",
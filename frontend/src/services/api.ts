@@ -20,11 +20,14 @@ export interface Stats {
 }
 
 export interface TaskStatus {
-  status: 'processing' | 'completed';
+  status: 'processing' | 'completed' | 'failed' | 'cancelled' | 'expired';
   progress?: number;
   total?: number;
+  queue_position?: number | null;
+  error?: string;
   data?: AnalysisResult[];
   stats?: Stats;
+  pagination?: Pagination;
 }
 
 export interface ValidationMetrics {
@@ -41,9 +44,59 @@ export const uploadFile = async (file: File): Promise<{ task_id: string }> => {
   return data;
 };
 
+export interface Pagination {
+  offset: number;
+  limit: number;
+  total: number;
+  next_offset: number | null;
+}
+
+// Размер страницы при выгрузке результата целиком; сервер ограничивает его
+// MAX_PAGE_SIZE и в ответе сообщает фактический limit
+const RESULTS_PAGE_SIZE = 10000;
+
+// Результат отдаётся постранично: собираем все страницы, чтобы дашборд,
+// поиск и фильтры работали по полному набору строк
 export const getResults = async (taskId: string): Promise<TaskStatus> => {
-  const { data } = await api.get(`/results/${taskId}`);
-  return data;
+  const { data } = await api.get(`/results/${taskId}`, {
+    params: { limit: RESULTS_PAGE_SIZE },
+  });
+  if (data.status !== 'completed') return data;
+  const rows: AnalysisResult[] = [...(data.data || [])];
+  let next: number | null = data.pagination?.next_offset ?? null;
+  while (next !== null) {
+    const { data: page } = await api.get(`/results/${taskId}`, {
+      params: { offset: next, limit: RESULTS_PAGE_SIZE },
+    });
+    rows.push(...(page.data || []));
+    next = page.pagination?.next_offset ?? null;
+  }
+  return { ...data, data: rows };
+};
+
+// Прогресс задачи приходит через Server-Sent Events; после финального
+// события поток закрывается. При обрыве соединения EventSource сам
+// переподключался бы бесконечно, поэтому поток закрывается и вызывается
+// onError. Возвращает функцию отписки.
+export const subscribeToTask = (
+  taskId: string,
+  onEvent: (event: TaskStatus) => void,
+  onError: () => void,
+): (() => void) => {
+  const source = new EventSource(`/api/results/${taskId}/events`);
+  const handle = (message: MessageEvent) => {
+    const event: TaskStatus = JSON.parse(message.data);
+    if (event.status !== 'processing') source.close();
+    onEvent(event);
+  };
+  ['progress', 'completed', 'failed', 'cancelled', 'expired'].forEach((name) =>
+    source.addEventListener(name, handle),
+  );
+  source.onerror = () => {
+    source.close();
+    onError();
+  };
+  return () => source.close();
 };
 
 export const downloadResults = (taskId: string) => {